@@ -25,8 +25,18 @@ urlpatterns = [
     path('accounts/', include('django.contrib.auth.urls')),
     path('accounts/register/', views.register, name='register'),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('stats/throughput/', views.throughput, name='throughput'),
     path('', views.index, name='index'),
     path('cost_comparison/', views.cost_comparison, name='cost_comparison'),
     path('cumulative_cost/', views.cumulative_cost, name='cumulative_cost'),
     path('trajectory_animation/', views.trajectory_animation, name='trajectory_animation'),
+    path('trajectory/data/<str:path>/', views.trajectory_data, name='trajectory_data'),
+    path('optimize/', views.optimize_route_start, name='optimize_route_start'),
+    path('optimize/stream/', views.optimize_route_stream, name='optimize_route_stream'),
+    path('optimize/<str:task_id>/', views.optimize_route_status, name='optimize_route_status'),
+    path('fleet/plan/', views.fleet_plan, name='fleet_plan'),
+    path('live/', views.live, name='live'),
+    path('live/feed/', views.live_feed, name='live_feed'),
+    path('ingest/', views.ingest, name='ingest'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
@@ -0,0 +1,237 @@
+import statistics
+import tracemalloc
+from io import StringIO
+from time import perf_counter
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import CostCheckpoint, DeliveryRollup, Dock, LogisticsData, Robot
+from .optimization import calculate_original_cost, calculate_optimized_route, compare_solvers, parse_route, parse_routes
+from .plan_cache import invalidate_plans
+
+# Scale name -> (docks, trips, robots)
+DEFAULT_SCALES = {
+    'small': (20, 200, 2),
+    'medium': (100, 2000, 5),
+    'large': (500, 10000, 10),
+}
+
+# Tables the benchmark datasets are generated into, children first
+TABLES = (DeliveryRollup, CostCheckpoint, LogisticsData, Dock, Robot)
+
+# Benchmark name -> (URL name, URL arguments)
+VIEWS = {
+    'view_dashboard': ('dashboard', []),
+    'view_cost_comparison': ('cost_comparison', []),
+    'view_cumulative_cost': ('cumulative_cost', []),
+    'view_trajectory_animation': ('trajectory_animation', []),
+    'view_trajectory_data_original': ('trajectory_data', ['original']),
+    'view_trajectory_data_optimized': ('trajectory_data', ['optimized']),
+    'view_fleet_plan': ('fleet_plan', []),
+    'view_throughput': ('throughput', []),
+}
+
+
+def parse_scale(value):
+    """
+    Parse a scale given as 'NAME=DOCKSxTRIPSxROBOTS' (or just 'DOCKSxTRIPSxROBOTS', or the name of
+    a default scale).
+
+    Returns:
+        tuple: (name, (docks, trips, robots))
+    """
+    if value in DEFAULT_SCALES:
+        return value, DEFAULT_SCALES[value]
+    name, _, size = value.rpartition('=')
+    try:
+        docks, trips, robots = (int(part) for part in size.lower().split('x'))
+    except ValueError:
+        raise ValueError(f"Invalid scale {value!r}, expected NAME=DOCKSxTRIPSxROBOTS")
+    if min(docks, robots) <= 0 or trips < 0:
+        raise ValueError(f"Invalid scale {value!r}, docks and robots must be positive")
+    return name or size, (docks, trips, robots)
+
+
+def measure(function, repeat=3, reset=None):
+    """
+    Run `function` `repeat` times, plus one traced run, and measure it.
+
+    The first (cold) run and the `repeat - 1` warm runs are timed without tracing. A separate run
+    after the cold one is traced for its query count and peak memory (tracemalloc, Python
+    allocations only), so the tracing overhead never shows up in the timings. `reset` (e.g.
+    invalidate_plans) is called before the cold and the traced run so that both start without
+    cached results; caches such as the plan cache then show up as the difference between the cold
+    and warm times.
+
+    Returns:
+        dict: cold (seconds), warm (median seconds of the warm runs, None for a single run),
+            queries, peak_memory (bytes) and result (the cold run's return value).
+    """
+    if reset is not None:
+        reset()
+    started = perf_counter()
+    result = function()
+    cold = perf_counter() - started
+
+    if reset is not None:
+        reset()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as context:
+            function()
+        # captured_queries is a view of the connection's query log, which later runs can reset
+        queries = len(context.captured_queries)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat - 1):
+        started = perf_counter()
+        function()
+        timings.append(perf_counter() - started)
+    return {
+        'cold': cold,
+        'warm': statistics.median(timings) if timings else None,
+        'queries': queries,
+        'peak_memory': peak,
+        'result': result,
+    }
+
+
+def _timing(measurement):
+    return {key: value for key, value in measurement.items() if key != 'result'}
+
+
+def _clear_tables():
+    """
+    Empty the benchmark tables with plain DELETE statements, without loading rows or sending signals.
+    """
+    with connection.cursor() as cursor:
+        for model in TABLES:
+            cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+
+
+def run_scale(docks, trips, robots, seed=0, repeat=3, time_budget=1.0, force=False):
+    """
+    Generate a seeded synthetic dataset and benchmark the cost engine, the optimizer and the views
+    against it.
+
+    The logistics tables must be empty, as in a dedicated test database (see the benchmark
+    command), so the results only depend on the scale and the seed. With `force`, existing rows are
+    deleted first; this holds write locks on those tables until the benchmark ends. Everything runs in
+    a transaction that is rolled back, so the database is left untouched either way.
+
+    Parameters:
+        docks, trips, robots (int): Size of the dataset (see populatedata --bulk).
+        seed (int): Seed of the dataset and of the savings solver.
+        repeat (int): Untraced runs per benchmark.
+        time_budget (float): Seconds of planning allowed to the savings solver.
+        force (bool): Benchmark even if the logistics tables hold data.
+
+    Returns:
+        dict: The dataset size, the timings of each benchmark and the route quality
+            (original, greedy and savings cost of the first robot, the one the views show).
+    """
+    with transaction.atomic():
+        if any(model.objects.exists() for model in TABLES):
+            if not force:
+                raise ValueError("The database already holds logistics data; benchmark in an empty database")
+            _clear_tables()
+        call_command(
+            'populatedata', bulk=True, docks=docks, trips=trips, robots=robots, seed=seed, stdout=StringIO()
+        )
+        robot = Robot.objects.order_by('id').first()
+        routes = list(LogisticsData.objects.values_list('route_taken', flat=True))
+
+        # Cached plans outlive the rollback, so the cold and traced runs of everything that plans
+        # start from an empty plan cache
+        timings = {}
+        timings['parse_route'] = measure(lambda: [parse_route(route) for route in routes], repeat)
+        timings['parse_routes'] = measure(lambda: parse_routes(routes), repeat)
+        timings['calculate_original_cost'] = measure(lambda: calculate_original_cost(robot), repeat)
+        timings['calculate_optimized_route'] = measure(
+            lambda: calculate_optimized_route(robot, persist=False), repeat, invalidate_plans
+        )
+        timings['savings_solver'] = measure(
+            lambda: compare_solvers(robot, time_budget=time_budget, seed=seed), repeat, invalidate_plans
+        )
+
+        client = Client()
+        client.force_login(User.objects.create_user('benchmark'))
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, (url_name, args) in VIEWS.items():
+                url = reverse(url_name, args=args)
+
+                def get():
+                    response = client.get(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    return response.status_code
+
+                timings[name] = measure(get, repeat, invalidate_plans)
+
+        original_cost = timings['calculate_original_cost']['result'][0]
+        greedy_cost = timings['calculate_optimized_route']['result'][0]
+        report = timings['savings_solver']['result']
+        result = {
+            'docks': docks,
+            'trips': trips,
+            'robots': robots,
+            'records': len(routes),
+            'timings': {name: _timing(measurement) for name, measurement in timings.items()},
+            'statuses': {name: timings[name]['result'] for name in VIEWS},
+            'quality': {
+                'original_cost': original_cost,
+                'greedy_cost': greedy_cost,
+                'savings_cost': report['total_cost'],
+                'greedy_saved_percent': (original_cost - greedy_cost) / original_cost * 100 if original_cost else 0.0,
+                'savings_saved_percent': report['saved_percent'],
+            },
+        }
+        transaction.set_rollback(True)
+    return result
+
+
+def find_regressions(results, baseline, tolerance=0.2):
+    """
+    Compare benchmark results with a baseline run of the same scales.
+
+    A benchmark regresses when its cold or warm time exceeds the baseline by more than
+    `tolerance` (a fraction), or when it issues more queries; a plan regresses when its greedy or
+    savings cost is higher than the baseline's. Scales or benchmarks missing from either run are
+    ignored.
+
+    Returns:
+        list: One message per regression.
+    """
+    regressions = []
+    previous_scales = {scale['name']: scale for scale in baseline.get('scales', [])}
+    for scale in results['scales']:
+        previous = previous_scales.get(scale['name'])
+        if previous is None:
+            continue
+        for name, timing in scale['timings'].items():
+            before = previous['timings'].get(name)
+            if before is None:
+                continue
+            for key in ('cold', 'warm'):
+                if timing[key] is not None and before[key] and timing[key] > before[key] * (1 + tolerance):
+                    regressions.append(
+                        f"{scale['name']}/{name}: {key} time {timing[key]:.4f}s (baseline {before[key]:.4f}s)"
+                    )
+            if timing['queries'] > before['queries']:
+                regressions.append(
+                    f"{scale['name']}/{name}: {timing['queries']} queries (baseline {before['queries']})"
+                )
+        for key in ('greedy_cost', 'savings_cost'):
+            # Costs are compared with a small tolerance for floating-point summation order
+            if scale['quality'][key] > previous['quality'][key] * (1 + 1e-9) + 1e-9:
+                regressions.append(
+                    f"{scale['name']}: {key} {scale['quality'][key]:.2f} (baseline {previous['quality'][key]:.2f})"
+                )
+    return regressions
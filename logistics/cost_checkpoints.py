@@ -0,0 +1,105 @@
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from .models import CostCheckpoint, LogisticsData
+
+
+def checkpoint_interval():
+    """
+    Number of records covered by each checkpoint, configured by LOGISTICS_COST_CHECKPOINT_INTERVAL.
+    """
+    return getattr(settings, 'LOGISTICS_COST_CHECKPOINT_INTERVAL', 1000)
+
+
+def _running_total(start, lengths):
+    """
+    Cumulative cost after each segment, continuing from `start`. Checkpoints and the live tail
+    are both computed this way, so the series is the same however it was split.
+    """
+    return np.cumsum(np.concatenate([[start], lengths]))[1:]
+
+
+def cumulative_cost_series(robot, save=True):
+    """
+    Cumulative original-cost series of a robot: the running total of segment distances after
+    each delivery record, ordered by timestamp, records with an unparsable route skipped (the same
+    series as load_route_history).
+
+    The covered part of the series is read from the robot's latest CostCheckpoint, which holds
+    the series from the first record up to its own last one; only records newer than that are read
+    from LogisticsData. When `save` is True and at least one full interval of new records has
+    accumulated, a new checkpoint covering them replaces the previous one, so the next call reads
+    even less while every call loads a single checkpoint.
+
+    Parameters:
+        robot (Robot): The robot whose series is computed.
+        save (bool): Whether to store a new checkpoint.
+
+    Returns:
+        numpy.ndarray: The cumulative cost after each record.
+    """
+    checkpoint = (
+        CostCheckpoint.objects.filter(robot=robot).order_by('-sequence')
+        .values_list('sequence', 'last_timestamp', 'last_record_id', 'cumulative_cost', 'series')
+        .first()
+    )
+    records = (
+        LogisticsData.objects.filter(robot=robot, distance__isnull=False)
+        .order_by('timestamp', 'id')
+    )
+    prefix = np.empty(0)
+    sequence = 0
+    total = 0.0
+    if checkpoint is not None:
+        sequence, timestamp, pk, total, series = checkpoint
+        prefix = np.frombuffer(series, dtype=float)
+        sequence += 1
+        records = records.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+    rows = list(records.values_list('distance', 'id').iterator(chunk_size=10000))
+    series = np.concatenate([prefix, _running_total(total, np.array([distance for distance, _ in rows], dtype=float))])
+
+    interval = checkpoint_interval()
+    full = len(rows) // interval * interval
+    if save and full:
+        end = rows[full - 1][1]
+        covered = len(prefix) + full
+        CostCheckpoint.objects.bulk_create(
+            [
+                CostCheckpoint(
+                    robot=robot,
+                    sequence=sequence,
+                    last_timestamp=LogisticsData.objects.values_list('timestamp', flat=True).get(pk=end),
+                    last_record_id=end,
+                    record_count=covered,
+                    cumulative_cost=float(series[covered - 1]),
+                    series=series[:covered].tobytes(),
+                )
+            ],
+            # A concurrent request may have stored the same checkpoint already
+            ignore_conflicts=True,
+        )
+        # The new checkpoint holds everything the previous one did
+        CostCheckpoint.objects.filter(robot=robot, sequence__lt=sequence).delete()
+    return series
+
+
+def invalidate_checkpoints(robot=None, timestamp=None, record_id=None):
+    """
+    Drop checkpoints that no longer match the history.
+
+    With a timestamp (and record id), only the checkpoints of `robot` covering records at or after
+    that position are dropped; otherwise all checkpoints of `robot` (or of every robot) are.
+    Checkpoints are kept in sync with individual saves and deletions through signals; code that
+    rewrites or deletes history in bulk (queryset update/delete) must call this itself.
+    """
+    checkpoints = CostCheckpoint.objects.all()
+    if robot is not None:
+        checkpoints = checkpoints.filter(robot=robot)
+    if timestamp is not None:
+        position = Q(last_timestamp__gt=timestamp)
+        if record_id is not None:
+            position |= Q(last_timestamp=timestamp, last_record_id__gte=record_id)
+        else:
+            position |= Q(last_timestamp=timestamp)
+        checkpoints = checkpoints.filter(position)
+    checkpoints.delete()
@@ -0,0 +1,197 @@
+import threading
+import numpy as np
+from django.conf import settings
+from .models import Dock
+
+# Key of a slot left free by a removed node
+_FREE = object()
+
+
+class DistanceMatrix:
+    """
+    Dense matrix of distances between named locations (the warehouse and the docks).
+
+    Nodes can be added, moved and removed one at a time; each change recomputes only the
+    affected row and column, so keeping the matrix in sync costs O(n) per changed node (plus one
+    copy of the matrix per sync while views are handed out, see below) instead of recomputing all
+    O(n^2) entries. Distances are computed with the same expression as
+    euclidean_distance in float64, so they are bit-identical to computing them on the fly.
+
+    A node keeps its slot until it is removed, and freed slots are reused by new nodes. Views
+    returned by submatrix() are snapshots: the first change after a view was handed out writes to a
+    copy of the matrix (copy-on-write), so a view never mixes distances from before and after a
+    sync, even when its own nodes move or their slots are reused.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.index = {}
+        self._free = []
+        self._coords = np.empty((0, 2))
+        self._matrix = np.empty((0, 0))
+        self._shared = False
+
+    def __len__(self):
+        return len(self.index)
+
+    def _reserve(self, size):
+        capacity = len(self._coords)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2, 16)
+        count = len(self.keys)
+        coords = np.empty((capacity, 2))
+        coords[:count] = self._coords[:count]
+        matrix = np.empty((capacity, capacity))
+        matrix[:count, :count] = self._matrix[:count, :count]
+        self._coords = coords
+        self._matrix = matrix
+        self._shared = False
+
+    def _detach(self):
+        # Leave the array read by live SubMatrix views untouched
+        if self._shared:
+            self._matrix = self._matrix.copy()
+            self._shared = False
+
+    def set_node(self, key, x, y):
+        """
+        Add a node or move an existing one.
+
+        Returns:
+            bool: True if the matrix changed.
+        """
+        i = self.index.get(key)
+        if i is None:
+            if self._free:
+                i = self._free.pop()
+                self.keys[i] = key
+            else:
+                i = len(self.keys)
+                self._reserve(i + 1)
+                self.keys.append(key)
+            self.index[key] = i
+        elif self._coords[i, 0] == x and self._coords[i, 1] == y:
+            return False
+        self._detach()
+        self._coords[i] = (x, y)
+        count = len(self.keys)
+        coords = self._coords[:count]
+        row = np.sqrt((coords[:, 0] - x)**2 + (coords[:, 1] - y)**2)
+        self._matrix[i, :count] = row
+        self._matrix[:count, i] = row
+        return True
+
+    def remove_node(self, key):
+        """
+        Remove a node; its slot is reused by the next node added.
+        """
+        i = self.index.pop(key)
+        self.keys[i] = _FREE
+        self._free.append(i)
+
+    def sync(self, nodes):
+        """
+        Bring the matrix in line with a {key: (x, y)} mapping, touching only nodes that were
+        added, moved or removed.
+
+        Returns:
+            int: The number of nodes that changed.
+        """
+        changed = 0
+        for key in [key for key in self.index if key not in nodes]:
+            self.remove_node(key)
+            changed += 1
+        for key, (x, y) in nodes.items():
+            changed += self.set_node(key, x, y)
+        return changed
+
+    def submatrix(self, keys):
+        """
+        Distances between the given nodes, as a (len(keys), len(keys)) SubMatrix view.
+        """
+        self._shared = True
+        return SubMatrix(self._matrix, [self.index[key] for key in keys])
+
+
+class SubMatrix:
+    """
+    Read-only snapshot view of the distances between some nodes of a DistanceMatrix, indexed by the
+    nodes' positions in the list it was built from.
+
+    Entries are read from the full matrix when they are accessed, so a planner that only visits a
+    few rows never pays for copying all k^2 distances. Indexing follows numpy: m[i, 1:] is a row,
+    m[nodes, 0] a column and m[np.ix_(rows, cols)] a block, each returned as a new array, and
+    m.item(i, j) a single float. The view is pickled (e.g. to be sent to a worker process) as a
+    plain numpy array of its entries.
+    """
+
+    __slots__ = ('_matrix', '_positions', '_slots')
+
+    def __init__(self, matrix, positions):
+        self._matrix = matrix
+        self._positions = positions
+        self._slots = np.asarray(positions, dtype=np.intp)
+
+    def __len__(self):
+        return len(self._positions)
+
+    @property
+    def shape(self):
+        return (len(self._positions), len(self._positions))
+
+    def item(self, i, j):
+        return self._matrix.item(self._positions[i], self._positions[j])
+
+    def __getitem__(self, key):
+        rows, columns = key
+        return self._matrix[self._slots[rows], self._slots[columns]]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self._matrix[np.ix_(self._slots, self._slots)]
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def __reduce__(self):
+        return np.asarray(self).__reduce__()
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def distance_submatrices(warehouse, dock_name_groups):
+    """
+    Distances between the warehouse and each group of docks, read from the process-wide
+    distance matrix.
+
+    The matrix lives in this process only and is synced with the current Dock coordinates (one
+    query for all groups), so only nodes that changed since the previous call are recomputed. The
+    returned views are snapshots, so later syncs by other threads never change them.
+    Above LOGISTICS_DISTANCE_MATRIX_MAX_NODES locations no matrix is kept and None is returned
+    for every group; callers then compute distances directly.
+
+    Parameters:
+        warehouse (tuple): Warehouse coordinates (x, y).
+        dock_name_groups (list): Lists of dock names, each in planner order.
+
+    Returns:
+        list: One (n + 1, n + 1) SubMatrix per group, where node 0 is the warehouse and node i + 1
+            is the group's i-th dock, or None.
+    """
+    global _matrix
+    nodes = {None: warehouse}
+    nodes.update((name, (x, y)) for name, x, y in Dock.objects.values_list('name', 'location_x', 'location_y'))
+    if len(nodes) > getattr(settings, 'LOGISTICS_DISTANCE_MATRIX_MAX_NODES', 2000):
+        return [None for _ in dock_name_groups]
+    with _lock:
+        if _matrix is None:
+            _matrix = DistanceMatrix()
+        _matrix.sync(nodes)
+        return [_matrix.submatrix([None, *names]) for names in dock_name_groups]
+
+
+def distance_submatrix(warehouse, dock_names):
+    """
+    Distances between the warehouse and the given docks, as returned by distance_submatrices.
+    """
+    return distance_submatrices(warehouse, [dock_names])[0]
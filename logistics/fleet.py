@@ -0,0 +1,204 @@
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import current_process
+from django.conf import settings
+from django.db.models import Sum
+from .models import Dock, Robot
+from .optimization import get_warehouse_position
+from .planning import plan_greedy_trips
+from .distance_matrix import distance_submatrices
+
+# Below this many docks across all robots, planning in the current process beats shipping the jobs
+# to worker processes
+PARALLEL_MIN_DOCKS = 2000
+
+# Worker processes shared by every fleet plan of this process, started on first use
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def load_fleet_demand():
+    """
+    Pending demand of every dock across all robots' delivery records, capped at the dock's
+    maximum capacity, computed in a single grouped query.
+
+    Returns:
+        list: One (name, x, y, demand) tuple per dock with pending demand, ordered by dock id.
+    """
+    docks = (
+        Dock.objects.annotate(delivered=Sum('logisticsdata__load_delivered'))
+        .filter(delivered__gt=0)
+        .order_by('id')
+    )
+    return [
+        (dock.name, dock.location_x, dock.location_y, min(dock.delivered, dock.max_capacity))
+        for dock in docks
+    ]
+
+
+def _bearing(warehouse, x, y):
+    return math.atan2(y - warehouse[1], x - warehouse[0])
+
+
+def partition_demand(warehouse, docks, capacities):
+    """
+    Split dock demand across robots by sweeping around the warehouse.
+
+    Docks are sorted by bearing from the warehouse and cut into contiguous sectors, one per robot,
+    so that each robot's share of the total demand is proportional to its capacity. A dock lying on
+    a sector boundary has its demand split between the two robots.
+
+    Robots with no capacity get an empty share.
+
+    Parameters:
+        warehouse (tuple): Warehouse coordinates (x, y).
+        docks (list): One (name, x, y, demand) tuple per dock.
+        capacities (list): Capacity of each robot, in sweep order.
+
+    Returns:
+        list: One list of (name, x, y, demand) tuples per robot.
+    """
+    parts = [[] for _ in capacities]
+    if not capacities:
+        return parts
+    capacities = [max(capacity, 0) for capacity in capacities]
+    total_demand = sum(demand for _, _, _, demand in docks)
+    total_capacity = sum(capacities)
+    if total_capacity <= 0:
+        raise ValueError("At least one robot must have a positive capacity")
+    # Cumulative demand at which each robot's sector ends
+    boundaries = []
+    cumulative_capacity = 0
+    for capacity in capacities:
+        cumulative_capacity += capacity
+        boundaries.append(round(total_demand * cumulative_capacity / total_capacity))
+    # The last robot able to carry cargo takes whatever rounding leaves over
+    last = max(i for i, capacity in enumerate(capacities) if capacity > 0)
+
+    order = sorted(
+        range(len(docks)),
+        key=lambda i: (
+            _bearing(warehouse, docks[i][1], docks[i][2]),
+            math.hypot(docks[i][1] - warehouse[0], docks[i][2] - warehouse[1]),
+            i,
+        ),
+    )
+    robot = 0
+    assigned = 0
+    for i in order:
+        name, x, y, demand = docks[i]
+        while demand > 0:
+            while robot < last and assigned >= boundaries[robot]:
+                robot += 1
+            amount = demand if robot == last else min(demand, boundaries[robot] - assigned)
+            parts[robot].append((name, x, y, amount))
+            demand -= amount
+            assigned += amount
+    return parts
+
+
+def _get_executor(max_workers):
+    """
+    The shared process pool, restarted with more workers if `max_workers` exceeds its size.
+    """
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers < max_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ProcessPoolExecutor(max_workers=max_workers)
+            _executor_workers = max_workers
+        return _executor
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _run_plans(jobs, max_workers):
+    """
+    Run plan_greedy_trips for each (warehouse, docks, capacity, start, distances) job.
+
+    Jobs go to the shared process pool when there is more than one job and more than one worker;
+    without an explicit `max_workers`, fleets with fewer than PARALLEL_MIN_DOCKS docks in total
+    are planned in the current process, where they finish before the jobs could be sent out.
+    """
+    if max_workers is None:
+        if sum(len(job[1]) for job in jobs) < PARALLEL_MIN_DOCKS:
+            max_workers = 1
+        else:
+            max_workers = getattr(settings, 'LOGISTICS_FLEET_WORKERS', 0) or os.cpu_count() or 1
+    max_workers = min(max_workers, len(jobs))
+    # Daemonic processes (e.g. Celery prefork workers) are not allowed to have children
+    if max_workers <= 1 or current_process().daemon:
+        return [plan_greedy_trips(*job) for job in jobs]
+    executor = _get_executor(max_workers)
+    try:
+        return list(executor.map(
+            plan_greedy_trips, *zip(*jobs),
+            chunksize=max(1, len(jobs) // (max_workers * 4)),
+        ))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time and plan here
+        _discard_executor(executor)
+        return [plan_greedy_trips(*job) for job in jobs]
+
+
+def plan_fleet(robots=None, max_workers=None):
+    """
+    Plan deliveries for the whole fleet.
+
+    All pending dock demand (see load_fleet_demand) is partitioned across the robots (see
+    partition_demand), and each robot's share is planned with the greedy algorithm using the
+    robot's own capacity, starting its first trip from its current position. Large fleets are
+    planned in parallel in a process pool shared by the calls (see _run_plans).
+
+    Parameters:
+        robots (iterable): Robots to plan for; defaults to every active robot. Robots without
+            capacity are left out.
+        max_workers (int): Number of planner processes; defaults to the LOGISTICS_FLEET_WORKERS
+            setting, or the number of CPUs, for fleets of PARALLEL_MIN_DOCKS docks or more.
+            1 plans in the current process.
+
+    Returns:
+        dict: A dictionary containing the following elements:
+            - plans (list): One entry per robot with its identifier, id, total cost, delivered amount
+              and trips (in the format returned by calculate_optimized_route).
+            - makespan (float): Distance driven by the busiest robot, i.e. the fleet's completion time.
+            - total_cost (float): Distance driven by all robots together.
+    """
+    if robots is None:
+        robots = Robot.objects.filter(is_active=True, capacity__gt=0).order_by('id')
+    warehouse = get_warehouse_position()
+    robots = [robot for robot in robots if robot.capacity > 0]
+    # Robots are swept in bearing order too, so each one tends to get the sector it is closest to
+    robots = sorted(robots, key=lambda robot: (_bearing(warehouse, robot.current_x, robot.current_y), robot.pk))
+    parts = partition_demand(warehouse, load_fleet_demand(), [robot.capacity for robot in robots])
+    distances = distance_submatrices(warehouse, [[name for name, _, _, _ in part] for part in parts])
+    jobs = [
+        (warehouse, part, robot.capacity, (robot.current_x, robot.current_y), matrix)
+        for robot, part, matrix in zip(robots, parts, distances)
+    ]
+    plans = []
+    for robot, (total_cost, trips, delivered) in zip(robots, _run_plans(jobs, max_workers)):
+        plans.append({
+            'robot': robot.identifier,
+            'robot_id': robot.pk,
+            'total_cost': total_cost,
+            'delivered': sum(delivered),
+            'trips': trips,
+        })
+    plans.sort(key=lambda plan: plan['robot_id'])
+    return {
+        'plans': plans,
+        'makespan': max((plan['total_cost'] for plan in plans), default=0),
+        'total_cost': sum(plan['total_cost'] for plan in plans),
+    }
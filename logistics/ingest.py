@@ -0,0 +1,164 @@
+import json
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from .models import Dock, LogisticsData, Robot
+from .optimization import parse_route
+from .profiling import count
+from .rollups import add_to_rollups
+from .live import publish_docks, publish_robot
+
+
+def ingest_batch_size():
+    """
+    Records written per transaction, configured by LOGISTICS_INGEST_BATCH_SIZE.
+    """
+    return getattr(settings, 'LOGISTICS_INGEST_BATCH_SIZE', 1000)
+
+
+def parse_ndjson(lines):
+    """
+    Yield one record per non-blank line of newline-delimited JSON; a line that is not valid JSON
+    is yielded as None so it is rejected with its index.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def _validate(record, robots, docks):
+    """
+    Check one incoming record and build its unsaved LogisticsData row.
+
+    Returns:
+        tuple: (row, errors); row is None when errors is not empty.
+    """
+    if not isinstance(record, dict):
+        return None, {'record': 'Expected a JSON object'}
+    errors = {}
+    robot = robots.get(record.get('robot')) if isinstance(record.get('robot'), str) else None
+    if robot is None:
+        errors['robot'] = f"Unknown robot: {record.get('robot')!r}"
+    dock = None
+    if record.get('dock') is not None:
+        dock = docks.get(record['dock']) if isinstance(record['dock'], str) else None
+        if dock is None:
+            errors['dock'] = f"Unknown dock: {record['dock']!r}"
+    load = record.get('load_delivered', 0)
+    if not isinstance(load, int) or isinstance(load, bool) or load < 0:
+        errors['load_delivered'] = 'Must be a non-negative integer'
+
+    route = record.get('route_taken')
+    if route is None and 'start' in record and 'end' in record:
+        try:
+            (x1, y1), (x2, y2) = [[float(value) for value in point] for point in (record['start'], record['end'])]
+            route = f"{x1},{y1} -> {x2},{y2}"
+        except (TypeError, ValueError):
+            pass
+    start, end = parse_route(route) if isinstance(route, str) else (None, None)
+    if not (start and end):
+        errors['route_taken'] = "Expected 'x1,y1 -> x2,y2' or start/end coordinate pairs"
+    if errors:
+        return None, errors
+
+    row = LogisticsData(robot=robot, dock=dock, route_taken=route, load_delivered=load)
+    row.fill_route_fields()
+    return row, {}
+
+
+def _write_batch(rows):
+    """
+    Insert one batch of validated rows in a single transaction and fold it into the aggregates:
+    dock loads and robot positions with one UPDATE each, and the delivery rollups.
+    """
+    loads = {}
+    positions = {}
+    for row in rows:
+        if row.dock_id is not None:
+            loads[row.dock_id] = loads.get(row.dock_id, 0) + row.load_delivered
+        # Rows are in arrival order, so the last one holds the robot's latest position
+        positions[row.robot_id] = (row.end_x, row.end_y)
+
+    with transaction.atomic():
+        LogisticsData.objects.bulk_create(rows)
+        if loads:
+            Dock.objects.filter(pk__in=loads).update(current_load=Case(
+                *[When(pk=pk, then=F('current_load') + Value(load)) for pk, load in loads.items()],
+                default=F('current_load'),
+            ))
+        Robot.objects.filter(pk__in=positions).update(
+            current_x=Case(*[When(pk=pk, then=Value(x)) for pk, (x, _) in positions.items()], default=F('current_x')),
+            current_y=Case(*[When(pk=pk, then=Value(y)) for pk, (_, y) in positions.items()], default=F('current_y')),
+        )
+        add_to_rollups(rows)
+        # Queryset updates send no signals, so the live feed is told explicitly
+        transaction.on_commit(lambda: publish_docks(Dock.objects.filter(pk__in=loads)))
+        transaction.on_commit(lambda: [publish_robot(robot) for robot in Robot.objects.filter(pk__in=positions)])
+
+
+def ingest_records(records, batch_size=None):
+    """
+    Validate and store incoming delivery records.
+
+    Each record is an object with `robot` (identifier), `dock` (name, or null for a return to the
+    warehouse), `load_delivered` and either `route_taken` ('x1,y1 -> x2,y2') or `start`/`end`
+    coordinate pairs; it is timestamped on arrival. Records are processed in batches of
+    `batch_size`: the valid records of a batch are written with one bulk_create in one transaction,
+    invalid ones are skipped and reported.
+
+    Parameters:
+        records (iterable): The incoming records (parsed JSON values), possibly a generator.
+        batch_size (int): Records per batch; defaults to LOGISTICS_INGEST_BATCH_SIZE.
+
+    Returns:
+        list: One acknowledgement per batch with its index, the index range of its records,
+            the number accepted and the rejected records' indexes and errors.
+    """
+    batch_size = batch_size or ingest_batch_size()
+    acknowledgements = []
+    batch = []
+    offset = 0
+
+    def flush():
+        def values(field):
+            return {
+                record[field] for record in batch
+                if isinstance(record, dict) and isinstance(record.get(field), str)
+            }
+
+        robots = {robot.identifier: robot for robot in Robot.objects.filter(identifier__in=values('robot'))}
+        docks = {dock.name: dock for dock in Dock.objects.filter(name__in=values('dock'))}
+        rows = []
+        rejected = []
+        for index, record in enumerate(batch, start=offset):
+            row, errors = _validate(record, robots, docks)
+            if errors:
+                rejected.append({'index': index, 'errors': errors})
+            else:
+                rows.append(row)
+        if rows:
+            _write_batch(rows)
+        count('records_ingested', len(rows))
+        count('records_rejected', len(rejected))
+        acknowledgements.append({
+            'batch': len(acknowledgements),
+            'first_index': offset,
+            'last_index': offset + len(batch) - 1,
+            'accepted': len(rows),
+            'rejected': rejected,
+        })
+
+    for record in records:
+        batch.append(record)
+        if len(batch) == batch_size:
+            flush()
+            offset += len(batch)
+            batch = []
+    if batch:
+        flush()
+    return acknowledgements
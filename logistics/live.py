@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .models import Dock, Robot
+
+CHANNEL = 'logistics:live'
+
+
+def robot_update(robot):
+    """
+    Live feed payload of a robot's position.
+    """
+    return {
+        'type': 'robot',
+        'id': robot.pk,
+        'identifier': robot.identifier,
+        'x': robot.current_x,
+        'y': robot.current_y,
+        'is_active': robot.is_active,
+    }
+
+
+def dock_update(dock):
+    """
+    Live feed payload of a dock's load.
+    """
+    return {
+        'type': 'dock',
+        'id': dock.pk,
+        'name': dock.name,
+        'x': dock.location_x,
+        'y': dock.location_y,
+        'current_load': dock.current_load,
+        'max_capacity': dock.max_capacity,
+    }
+
+
+class Subscription:
+    """
+    Updates pending for one live feed client, coalesced per robot or dock.
+
+    Publishing never blocks or queues without bound: a newer update of the same robot or dock
+    replaces the pending one, so a slow client only ever holds one update per entity and receives
+    the latest state when it catches up.
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def push(self, update):
+        """
+        Queue an update; must be called on the subscription's event loop.
+        """
+        self.pending[(update['type'], update['id'])] = update
+        self.ready.set()
+
+    async def drain(self):
+        """
+        Wait for at least one update and return every pending one.
+        """
+        await self.ready.wait()
+        self.ready.clear()
+        updates, self.pending = self.pending, {}
+        return list(updates.values())
+
+
+class LocalBroker:
+    """
+    In-process publish/subscribe. Only clients connected to the same process see the updates, so
+    it suits a single ASGI worker; use RedisBroker when running several.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def publish(self, update):
+        """
+        Send an update to every subscriber. Safe to call from any thread.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, update)
+            except RuntimeError:
+                # The subscriber's event loop has been closed
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self):
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                self._subscriptions.discard(subscription)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publish/subscribe over a Redis channel, shared by every process. Subscribers still get their
+    own coalescing Subscription, fed by one Redis connection per client.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("LOGISTICS_LIVE_BROKER_URL points at Redis, but the redis package is not installed")
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def publish(self, update):
+        self._client.publish(CHANNEL, json.dumps(update))
+
+    @asynccontextmanager
+    async def subscribe(self):
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(CHANNEL)
+
+        async def forward(subscription):
+            async for message in pubsub.listen():
+                if message['type'] == 'message':
+                    subscription.push(json.loads(message['data']))
+
+        async with super().subscribe() as subscription:
+            reader = asyncio.create_task(forward(subscription))
+            try:
+                yield subscription
+            finally:
+                reader.cancel()
+                await pubsub.aclose()
+                await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    The process-wide broker: RedisBroker when LOGISTICS_LIVE_BROKER_URL is set, LocalBroker otherwise.
+    """
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, 'LOGISTICS_LIVE_BROKER_URL', '')
+            _broker = RedisBroker(url) if url else LocalBroker()
+        return _broker
+
+
+def publish_robot(robot):
+    get_broker().publish(robot_update(robot))
+
+
+def publish_docks(docks):
+    broker = get_broker()
+    for dock in docks:
+        broker.publish(dock_update(dock))
+
+
+async def live_events(subscription, min_interval, heartbeat):
+    """
+    Server-sent events for a subscription: a snapshot of every robot and dock, then coalesced
+    updates at most every `min_interval` seconds, with a comment line every `heartbeat` seconds
+    of silence so proxies keep the connection open.
+    """
+    snapshot = [robot_update(robot) async for robot in Robot.objects.order_by('id')]
+    snapshot += [dock_update(dock) async for dock in Dock.objects.order_by('id')]
+    for update in snapshot:
+        yield format_event(update)
+    while True:
+        try:
+            updates = await asyncio.wait_for(subscription.drain(), timeout=heartbeat)
+        except asyncio.TimeoutError:
+            yield ': keepalive\n\n'
+            continue
+        for update in updates:
+            yield format_event(update)
+        # Updates arriving meanwhile are coalesced into the next batch
+        await asyncio.sleep(min_interval)
+
+
+def format_event(update):
+    return f"event: {update['type']}\ndata: {json.dumps(update)}\n\n"
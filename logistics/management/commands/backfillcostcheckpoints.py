@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from logistics.models import CostCheckpoint, Robot
+from logistics.cost_checkpoints import cumulative_cost_series, invalidate_checkpoints
+
+class Command(BaseCommand):
+    help = 'Store cumulative cost checkpoints for the existing delivery history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--robot',
+            help='Robot identifier (defaults to every robot)'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Drop existing checkpoints and rebuild them from scratch'
+        )
+
+    def handle(self, *args, **options):
+        robots = Robot.objects.order_by('id')
+        if options['robot']:
+            robots = robots.filter(identifier=options['robot'])
+            if not robots.exists():
+                raise CommandError("Robot not found, please generate data first.")
+
+        for robot in robots:
+            if options['rebuild']:
+                invalidate_checkpoints(robot)
+            series = cumulative_cost_series(robot)
+            covered = (
+                CostCheckpoint.objects.filter(robot=robot).order_by('-sequence')
+                .values_list('record_count', flat=True).first()
+            ) or 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{robot.identifier}: {len(series)} records, {covered} covered by the checkpoint"
+            ))
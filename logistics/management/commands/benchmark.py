@@ -0,0 +1,130 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from logistics.benchmarks import DEFAULT_SCALES, find_regressions, parse_scale, run_scale
+
+class Command(BaseCommand):
+    help = 'Benchmark the cost engine, the optimizer and the views on seeded synthetic datasets and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            action='append',
+            help=f"Dataset size as NAME=DOCKSxTRIPSxROBOTS or a default scale name ({', '.join(DEFAULT_SCALES)}); "
+                 f"can be repeated, defaults to every default scale"
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the datasets and of the savings solver'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Timed runs per benchmark (the first is the cold run); one more traced run counts queries and memory'
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=1.0,
+            help='Seconds of planning allowed to the savings solver'
+        )
+        parser.add_argument(
+            '--output',
+            default='benchmark.json',
+            help='File the JSON results are written to'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of a previous run; exit with an error if any benchmark regressed'
+        )
+        parser.add_argument(
+            '--in-place',
+            action='store_true',
+            help='Run in the configured database instead of a dedicated test database (changes are rolled back)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='With --in-place, run even if the database holds logistics data, locking its tables until the run ends'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed slowdown versus the baseline, as a fraction'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] <= 0:
+            raise CommandError("--repeat must be positive")
+        if options['force'] and not options['in_place']:
+            raise CommandError("--force requires --in-place")
+        try:
+            scales = [parse_scale(value) for value in options['scale'] or DEFAULT_SCALES]
+        except ValueError as error:
+            raise CommandError(error)
+
+        baseline = None
+        if options['baseline']:
+            # Read first: the baseline may be the file about to be overwritten by --output
+            with open(options['baseline']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        results = {
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'seed': options['seed'],
+            'repeat': options['repeat'],
+            'scales': [],
+        }
+        old_name = None
+        if not options['in_place']:
+            # Benchmark in a fresh database, like the test runner, so live data is never read or locked
+            self.stdout.write("Creating test database...")
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.run_scales(scales, results, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options['output'], 'w') as output:
+            json.dump(results, output, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if baseline is not None:
+            regressions = find_regressions(results, baseline, options['tolerance'])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions versus {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS("No regressions versus the baseline"))
+
+    def run_scales(self, scales, results, options):
+        for name, (docks, trips, robots) in scales:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}: {docks} docks, {trips} trips, {robots} robots"))
+            try:
+                scale = run_scale(
+                    docks, trips, robots, seed=options['seed'], repeat=options['repeat'],
+                    time_budget=options['time_budget'], force=options['force'],
+                )
+            except ValueError as error:
+                raise CommandError(f"{error} (run without --in-place to use a test database, or add --force)")
+            scale['name'] = name
+            results['scales'].append(scale)
+            for benchmark, timing in scale['timings'].items():
+                warm = f"{timing['warm']:.4f}s" if timing['warm'] is not None else '-'
+                self.stdout.write(
+                    f"{benchmark:32} cold {timing['cold']:.4f}s  warm {warm:>9}  "
+                    f"{timing['queries']:4} queries  {timing['peak_memory'] / 1024:10.1f} KiB"
+                )
+            quality = scale['quality']
+            self.stdout.write(
+                f"Cost: original {quality['original_cost']:.2f}, greedy {quality['greedy_cost']:.2f} "
+                f"({quality['greedy_saved_percent']:.2f}% saved), savings {quality['savings_cost']:.2f}"
+            )
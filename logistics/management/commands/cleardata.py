@@ -1,5 +1,76 @@
-from django.core.management.base import BaseCommand
-from logistics.models import LogisticsData, Dock
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from logistics.models import DeliveryRollup, LogisticsData, Dock
+from logistics.cost_checkpoints import invalidate_checkpoints
+
+
+def delete_rows(model, pks, using):
+    """
+    Delete rows of `model` by primary key with plain DELETE statements, without loading them or
+    sending signals. The keys are split to stay within the backend's query parameter limit, and
+    all statements run in one transaction.
+
+    Returns:
+        int: The number of rows deleted.
+    """
+    connection = connections[using]
+    step = connection.features.max_query_params or len(pks)
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    deleted = 0
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for start in range(0, len(pks), step):
+            chunk = pks[start:start + step]
+            cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            deleted += cursor.rowcount
+    return deleted
+
+
+def delete_in_batches(queryset, batch_size, progress=None, raw=False):
+    """
+    Delete the rows of a queryset in primary-key-ranged batches.
+
+    Each batch is one DELETE covering at most `batch_size` rows, committed on its own, so memory
+    use stays flat and locks are held briefly however large the table is. Models without delete
+    signals or cascades are deleted without loading the rows; with `raw`, only the primary keys of
+    each batch are read and the rows are deleted by key (see delete_rows), skipping delete signals,
+    so the caller must update any data they maintain.
+
+    Parameters:
+        queryset (QuerySet): The rows to delete.
+        batch_size (int): Maximum rows deleted per statement.
+        progress (callable): Called with the running total after each batch.
+        raw (bool): Delete without loading the rows or sending signals. Only for models that
+            nothing else references.
+
+    Returns:
+        int: The number of rows of the queryset's model that were deleted.
+    """
+    model = queryset.model
+    deleted = 0
+    last = None
+    while True:
+        remaining = queryset if last is None else queryset.filter(pk__gt=last)
+        if raw:
+            pks = list(remaining.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            count = delete_rows(model, pks, remaining.db) if pks else 0
+            # Primary key closing this batch; None once fewer than batch_size rows remain
+            upper = pks[-1] if len(pks) == batch_size else None
+        else:
+            upper = list(remaining.order_by('pk').values_list('pk', flat=True)[batch_size - 1:batch_size])
+            upper = upper[0] if upper else None
+            batch = remaining if upper is None else remaining.filter(pk__lte=upper)
+            _, counts = batch.delete()
+            count = counts.get(model._meta.label, 0)
+        deleted += count
+        if count and progress is not None:
+            progress(deleted)
+        if upper is None:
+            return deleted
+        last = upper
+
 
 class Command(BaseCommand):
     help = 'Clear all LogisticsData and/or Dock data'
@@ -15,13 +86,53 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear all Dock records'
         )
+        parser.add_argument(
+            '--older-than',
+            type=float,
+            default=None,
+            metavar='DAYS',
+            help='With --logisticsdata, only clear records older than this many days'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Maximum rows deleted per statement'
+        )
 
     def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError("--batch-size must be positive")
+        if options['older_than'] is not None and not options['logisticsdata']:
+            raise CommandError("--older-than requires --logisticsdata")
         if options['logisticsdata']:
-            count, _ = LogisticsData.objects.all().delete()
+            records = LogisticsData.objects.all()
+            if options['older_than'] is not None:
+                cutoff = timezone.now() - timedelta(days=options['older_than'])
+                records = records.filter(timestamp__lt=cutoff)
+            # Records are deleted without signals, which would load every row; checkpoints are dropped below
+            # and rollups are kept or purged on purpose
+            count = self.purge(records, batch_size, 'LogisticsData', raw=True)
+            if count:
+                invalidate_checkpoints()
+            # Rollups outlive pruned history, so statistics stay available after --older-than
+            if options['older_than'] is None:
+                self.purge(DeliveryRollup.objects.all(), batch_size, 'DeliveryRollup')
             self.stdout.write(self.style.SUCCESS(f"Successfully cleared {count} LogisticsData records"))
         if options['dock']:
-            count, _ = Dock.objects.all().delete()
+            # Cascaded delivery records are purged in batches first, so deleting docks stays cheap
+            if self.purge(LogisticsData.objects.filter(dock__isnull=False), batch_size, 'LogisticsData', raw=True):
+                invalidate_checkpoints()
+            count = self.purge(Dock.objects.all(), batch_size, 'Dock')
             self.stdout.write(self.style.SUCCESS(f"Successfully cleared {count} Dock records"))
         if not options['logisticsdata'] and not options['dock']:
             self.stdout.write(self.style.WARNING("Please specify at least one option: --logisticsdata or --dock"))
+
+    def purge(self, queryset, batch_size, label, raw=False):
+        total = queryset.count()
+        return delete_in_batches(
+            queryset, batch_size,
+            progress=lambda deleted: self.stdout.write(f"Deleted {deleted}/{total} {label} records"),
+            raw=raw,
+        )
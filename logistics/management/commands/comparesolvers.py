@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from logistics.models import Robot
+from logistics.optimization import compare_solvers
+
+class Command(BaseCommand):
+    help = 'Compare the savings + local search solver against the greedy route for a robot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--robot',
+            help='Robot identifier (defaults to the first robot)'
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=None,
+            help='Maximum seconds spent planning'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=None,
+            help='Maximum local search passes'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed of the local search'
+        )
+
+    def handle(self, *args, **options):
+        if options['robot']:
+            robot = Robot.objects.filter(identifier=options['robot']).first()
+        else:
+            robot = Robot.objects.first()
+        if robot is None:
+            raise CommandError("Robot not found, please generate data first.")
+
+        report = compare_solvers(
+            robot,
+            time_budget=options['time_budget'],
+            max_iterations=options['iterations'],
+            seed=options['seed'],
+        )
+        self.stdout.write(f"Robot: {robot.identifier}")
+        self.stdout.write(f"Greedy cost: {report['greedy_cost']:.2f}")
+        self.stdout.write(f"Initial solution cost: {report['initial_cost']:.2f}")
+        self.stdout.write(f"Improved cost: {report['total_cost']:.2f}")
+        self.stdout.write(f"Local search: {report['iterations']} passes in {report['elapsed']:.3f}s ({report['stopped']})")
+        self.stdout.write(self.style.SUCCESS(
+            f"Distance saved versus greedy: {report['saved']:.2f} ({report['saved_percent']:.2f}%)"
+        ))
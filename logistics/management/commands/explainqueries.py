@@ -0,0 +1,82 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from logistics import views
+
+# View name -> (view function, URL arguments)
+VIEWS = {
+    'dashboard': (views.dashboard, []),
+    'cost_comparison': (views.cost_comparison, []),
+    'cumulative_cost': (views.cumulative_cost, []),
+    'trajectory_animation': (views.trajectory_animation, []),
+    'trajectory_data_original': (views.trajectory_data, ['original']),
+    'trajectory_data_optimized': (views.trajectory_data, ['optimized']),
+    'fleet_plan': (views.fleet_plan, []),
+    'throughput': (views.throughput, []),
+}
+URL_NAMES = {'trajectory_data_original': 'trajectory_data', 'trajectory_data_optimized': 'trajectory_data'}
+
+
+class Command(BaseCommand):
+    help = "Run each view against the current database and print the query plan of every SELECT it issues"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--view',
+            action='append',
+            choices=sorted(VIEWS),
+            help='Only explain this view (can be repeated; defaults to every view)'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only), executing each query and reporting actual timings'
+        )
+
+    def handle(self, *args, **options):
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        try:
+            prefix = connection.ops.explain_query_prefix(**explain_options)
+        except ValueError as error:
+            raise CommandError(f"{connection.vendor}: {error}")
+
+        factory = RequestFactory()
+        # Unsaved user: passes login_required without touching the database
+        user = User(username='explainqueries')
+
+        async def auser():
+            return user
+
+        self.stdout.write(f"Database backend: {connection.vendor}")
+        for name in options['view'] or VIEWS:
+            view, url_args = VIEWS[name]
+            request = factory.get(reverse(URL_NAMES.get(name, name), args=url_args))
+            request.user = user
+            request.auser = auser
+            if iscoroutinefunction(view):
+                view = async_to_sync(view)
+            # Views may write (checkpoints, dock loads); everything is rolled back afterwards
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as context:
+                    response = view(request, *url_args)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                transaction.set_rollback(True)
+            queries = [
+                query['sql'] for query in context.captured_queries
+                if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"\n== {name} (status {response.status_code}, {len(queries)} SELECT queries)"
+            ))
+            for number, sql in enumerate(queries, start=1):
+                self.stdout.write(self.style.SQL_KEYWORD(f"\n[{number}] {sql}"))
+                with connection.cursor() as cursor:
+                    cursor.execute(f"{prefix} {sql}")
+                    for row in cursor.fetchall():
+                        # SQLite returns (id, parent, notused, detail), PostgreSQL one line per row
+                        self.stdout.write(f"    {row[-1]}")
@@ -1,13 +1,202 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
+import math
 import random
-from time import sleep
+from datetime import timedelta
+from itertools import islice
+from time import perf_counter, sleep
+from logistics.cost_checkpoints import invalidate_checkpoints
 from logistics.models import Dock, Robot, LogisticsData, Warehouse
+from logistics.planning import euclidean_distance
+from logistics.rollups import rebuild_rollups
 
 class Command(BaseCommand):
     help = 'Generate original delivery data (randomly select Docks, regardless of whether they are at full capacity) to demonstrate differences before and after optimization'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Generate a large synthetic dataset with bulk inserts instead of the small demo data'
+        )
+        parser.add_argument(
+            '--robots',
+            type=int,
+            default=10,
+            help='Bulk mode: number of robots'
+        )
+        parser.add_argument(
+            '--docks',
+            type=int,
+            default=100,
+            help='Bulk mode: number of docks'
+        )
+        parser.add_argument(
+            '--trips',
+            type=int,
+            default=10000,
+            help='Bulk mode: total number of delivery trips, spread over the robots'
+        )
+        parser.add_argument(
+            '--days',
+            type=float,
+            default=30,
+            help='Bulk mode: the trips are spread evenly over this many days, up to now'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Bulk mode: seed of the random generator, for reproducible datasets'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Bulk mode: rows inserted per bulk_create/transaction'
+        )
+
+    def handle(self, *args, **options):
+        if options['bulk']:
+            self.populate_bulk(options)
+        else:
+            self.populate_demo()
+
+    def populate_bulk(self, options):
+        """
+        Generate a synthetic dataset of the requested size.
+
+        Docks are named "Bulk Dock N" and robots "BulkRobotN" so they do not collide with the demo
+        data; existing ones are reused. Each trip starts at the warehouse, delivers random amounts
+        to random docks until the robot's capacity is reached and returns; trips are timestamped at
+        even intervals over the last --days days. Rows are written with bulk_create in batches of
+        --batch-size, each batch in its own transaction; dock loads and the delivery rollups of the
+        affected days are written once at the end.
+        """
+        for option in ('robots', 'docks', 'batch_size', 'days'):
+            if options[option] <= 0:
+                raise CommandError(f"--{option.replace('_', '-')} must be positive")
+        if options['trips'] < 0:
+            raise CommandError("--trips must not be negative")
+        rng = random.Random(options['seed'])
+        started = perf_counter()
+
+        warehouse_obj, _ = Warehouse.objects.get_or_create(
+            id=1,
+            defaults={"location_x": 0, "location_y": 0, "pending_cargo": 0}
+        )
+        warehouse = (float(warehouse_obj.location_x), float(warehouse_obj.location_y))
+
+        # Docks are spread over a square that grows with their number, keeping density constant
+        extent = 10.0 * math.sqrt(options['docks'])
+        dock_names = [f"Bulk Dock {i + 1}" for i in range(options['docks'])]
+        existing = set(Dock.objects.filter(name__in=dock_names).values_list('name', flat=True))
+        Dock.objects.bulk_create(
+            [
+                Dock(
+                    name=name,
+                    location_x=round(warehouse[0] + rng.uniform(-extent, extent), 1),
+                    location_y=round(warehouse[1] + rng.uniform(-extent, extent), 1),
+                    current_load=0,
+                    max_capacity=rng.randint(10, 50),
+                )
+                for name in dock_names if name not in existing
+            ],
+            batch_size=options['batch_size'],
+        )
+        docks = list(Dock.objects.filter(name__in=dock_names).order_by('id'))
+
+        identifiers = [f"BulkRobot{i + 1:03d}" for i in range(options['robots'])]
+        existing = set(Robot.objects.filter(identifier__in=identifiers).values_list('identifier', flat=True))
+        Robot.objects.bulk_create(
+            [
+                Robot(identifier=identifier, current_x=warehouse[0], current_y=warehouse[1], is_active=True)
+                for identifier in identifiers if identifier not in existing
+            ],
+            batch_size=options['batch_size'],
+        )
+        robots = list(Robot.objects.filter(identifier__in=identifiers).order_by('id'))
+        self.stdout.write(self.style.SUCCESS(f'{len(docks)} docks and {len(robots)} robots ready'))
+
+        loads = {dock.pk: 0 for dock in docks}
+        end = timezone.now()
+        begin = end - timedelta(days=options['days'])
+        rows = self.generate_rows(rng, warehouse, robots, docks, options['trips'], loads, begin, end)
+        created = 0
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            with transaction.atomic():
+                LogisticsData.objects.bulk_create(batch)
+            created += len(batch)
+            self.stdout.write(f'{created} LogisticsData records written ({perf_counter() - started:.1f}s)')
+
+        for dock in docks:
+            dock.current_load += loads[dock.pk]
+        Dock.objects.bulk_update(docks, ['current_load'], batch_size=options['batch_size'])
+        # bulk_create bypasses the signals that maintain the rollups and cost checkpoints, so the days
+        # just written are rebuilt and checkpoints of reused robots covering them are dropped
+        rebuild_rollups(start=begin)
+        for robot in robots:
+            invalidate_checkpoints(robot, begin)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["trips"]} trips ({created} records) in {perf_counter() - started:.1f}s'
+        ))
+
+    @staticmethod
+    def generate_rows(rng, warehouse, robots, docks, trips, loads, begin, end):
+        """
+        Yield unsaved LogisticsData rows for `trips` trips, assigned to the robots in turn, with the
+        route columns filled in. Each trip gets an equal slot of the time between `begin` and `end`,
+        and its records are timestamped in order within the slot. Delivered amounts are added to
+        `loads` (keyed by dock id).
+        """
+        slot = (end - begin) / max(trips, 1)
+        for trip in range(trips):
+            robot = robots[trip % len(robots)]
+            capacity = max(robot.capacity, 1)
+            trip_start = begin + slot * trip
+            # A trip has at most one record per unit of capacity plus the return
+            step = slot / (capacity + 1)
+            stop = 0
+            trip_load = 0
+            current_position = warehouse
+            while trip_load < capacity:
+                selected = rng.choice(docks)
+                dock_position = (selected.location_x, selected.location_y)
+                deliver_amount = rng.randint(1, capacity - trip_load)
+                loads[selected.pk] += deliver_amount
+                yield LogisticsData(
+                    robot=robot,
+                    dock=selected,
+                    timestamp=trip_start + step * stop,
+                    route_taken=f"{current_position[0]},{current_position[1]} -> {dock_position[0]},{dock_position[1]}",
+                    load_delivered=deliver_amount,
+                    start_x=current_position[0],
+                    start_y=current_position[1],
+                    end_x=dock_position[0],
+                    end_y=dock_position[1],
+                    distance=euclidean_distance(current_position, dock_position),
+                )
+                trip_load += deliver_amount
+                current_position = dock_position
+                stop += 1
+            yield LogisticsData(
+                robot=robot,
+                dock=None,
+                timestamp=trip_start + step * stop,
+                route_taken=f"{current_position[0]},{current_position[1]} -> {warehouse[0]},{warehouse[1]}",
+                load_delivered=0,
+                start_x=current_position[0],
+                start_y=current_position[1],
+                end_x=warehouse[0],
+                end_y=warehouse[1],
+                distance=euclidean_distance(current_position, warehouse),
+            )
+
+    def populate_demo(self):
         self.stdout.write('Starting to create original simulation data (ignoring Dock capacity limits)...')
         
         # 1. Create dock data (initial current_load set to 0)
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from logistics.models import Robot
+from logistics.rollups import day_start, rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly and daily delivery rollups from LogisticsData'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only rebuild days from this date on (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--robot',
+            help='Robot identifier (defaults to every robot)'
+        )
+
+    def handle(self, *args, **options):
+        start = None
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError("--since must be a date formatted as YYYY-MM-DD")
+            start = day_start(since)
+        robot = None
+        if options['robot']:
+            robot = Robot.objects.filter(identifier=options['robot']).first()
+            if robot is None:
+                raise CommandError("Robot not found, please generate data first.")
+
+        written = rebuild_rollups(start=start, robot=robot)
+        self.stdout.write(self.style.SUCCESS(f"Successfully rebuilt {written} rollup rows"))
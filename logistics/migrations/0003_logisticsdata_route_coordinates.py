@@ -0,0 +1,77 @@
+# Generated by Django 5.1.7 on 2026-10-17 15:56
+
+import math
+
+from django.db import migrations, models
+
+BACKFILL_CHUNK_SIZE = 2000
+
+
+def backfill_route_coordinates(apps, schema_editor):
+    """
+    Parse route_taken of existing rows into the new coordinate and distance columns (rows that
+    cannot be parsed, or hold non-finite coordinates, are left null), walking the table in
+    primary-key ordered chunks to keep memory bounded.
+    """
+    LogisticsData = apps.get_model('logistics', 'LogisticsData')
+    fields = ['start_x', 'start_y', 'end_x', 'end_y', 'distance']
+    last_pk = 0
+    while True:
+        chunk = list(
+            LogisticsData.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'route_taken')[:BACKFILL_CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for record in chunk:
+            # Assign every field explicitly: the coordinate columns are deferred by only(), and
+            # bulk_update would otherwise fetch each of them with a query per skipped row
+            record.start_x = record.start_y = record.end_x = record.end_y = record.distance = None
+            try:
+                start_str, end_str = record.route_taken.split("->")
+                x1, y1 = [float(val) for val in start_str.strip().split(",")]
+                x2, y2 = [float(val) for val in end_str.strip().split(",")]
+            except Exception:
+                continue
+            # Like parse_route, treat nan and inf coordinates as unparseable
+            if not all(math.isfinite(val) for val in (x1, y1, x2, y2)):
+                continue
+            record.start_x, record.start_y, record.end_x, record.end_y = x1, y1, x2, y2
+            record.distance = math.sqrt((x1 - x2)**2 + (y1 - y2)**2)
+        LogisticsData.objects.bulk_update(chunk, fields)
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0002_warehouse_alter_logisticsdata_dock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='logisticsdata',
+            name='distance',
+            field=models.FloatField(blank=True, help_text='Route length, null if route_taken cannot be parsed', null=True),
+        ),
+        migrations.AddField(
+            model_name='logisticsdata',
+            name='end_x',
+            field=models.FloatField(blank=True, help_text='Route end X coordinate, parsed from route_taken', null=True),
+        ),
+        migrations.AddField(
+            model_name='logisticsdata',
+            name='end_y',
+            field=models.FloatField(blank=True, help_text='Route end Y coordinate, parsed from route_taken', null=True),
+        ),
+        migrations.AddField(
+            model_name='logisticsdata',
+            name='start_x',
+            field=models.FloatField(blank=True, help_text='Route start X coordinate, parsed from route_taken', null=True),
+        ),
+        migrations.AddField(
+            model_name='logisticsdata',
+            name='start_y',
+            field=models.FloatField(blank=True, help_text='Route start Y coordinate, parsed from route_taken', null=True),
+        ),
+        migrations.RunPython(backfill_route_coordinates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0003_logisticsdata_route_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='robot',
+            name='capacity',
+            field=models.PositiveIntegerField(default=5, help_text='Maximum units of cargo carried per trip'),
+        ),
+    ]
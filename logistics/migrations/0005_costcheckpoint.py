@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-17 17:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0004_robot_capacity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField(help_text="Position of the checkpoint in the robot's series, from 0")),
+                ('last_timestamp', models.DateTimeField(help_text='Timestamp of the last record covered')),
+                ('last_record_id', models.PositiveBigIntegerField(help_text='Id of the last record covered')),
+                ('record_count', models.PositiveIntegerField(help_text='Number of records covered by this checkpoint')),
+                ('cumulative_cost', models.FloatField(help_text='Cumulative cost after the last record covered')),
+                ('series', models.BinaryField(help_text='Cumulative cost after each covered record, as float64 values')),
+                ('robot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='logistics.robot')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('robot', 'sequence'), name='unique_cost_checkpoint_sequence')],
+            },
+        ),
+    ]
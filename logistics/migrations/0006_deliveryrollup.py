@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-17 17:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def build_rollups(apps, schema_editor):
+    """
+    Aggregate the existing history into hour and day rollups with one grouped query per period.
+    """
+    LogisticsData = apps.get_model('logistics', 'LogisticsData')
+    DeliveryRollup = apps.get_model('logistics', 'DeliveryRollup')
+    for period, truncate in (('hour', TruncHour), ('day', TruncDay)):
+        rows = (
+            LogisticsData.objects.annotate(bucket=truncate('timestamp'))
+            .values('bucket', 'robot', 'dock')
+            .annotate(
+                load=Coalesce(Sum('load_delivered'), 0),
+                length=Coalesce(Sum('distance'), Value(0.0), output_field=FloatField()),
+                records=Count('id'),
+                trips=Count('id', filter=Q(dock__isnull=True)),
+            )
+            .order_by()
+        )
+        DeliveryRollup.objects.bulk_create(
+            (
+                DeliveryRollup(
+                    period=period, bucket_start=row['bucket'], robot_id=row['robot'], dock_id=row['dock'],
+                    load_delivered=row['load'], distance=row['length'],
+                    record_count=row['records'], trip_count=row['trips'],
+                )
+                for row in rows.iterator(chunk_size=BACKFILL_BATCH_SIZE)
+            ),
+            batch_size=BACKFILL_BATCH_SIZE,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0005_costcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField(help_text='Start of the hour or day covered')),
+                ('load_delivered', models.BigIntegerField(default=0, help_text='Total delivery amount')),
+                ('distance', models.FloatField(default=0, help_text='Total route length of the records with a parsable route')),
+                ('record_count', models.PositiveIntegerField(default=0, help_text='Number of delivery records')),
+                ('trip_count', models.PositiveIntegerField(default=0, help_text='Number of completed trips (returns to the warehouse)')),
+                ('dock', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='logistics.dock')),
+                ('robot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='logistics.robot')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['period', 'bucket_start'], name='rollup_period_bucket_idx'),
+                    models.Index(fields=['robot', 'period', 'bucket_start'], name='rollup_robot_bucket_idx'),
+                    models.Index(fields=['dock', 'period', 'bucket_start'], name='rollup_dock_bucket_idx'),
+                ],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
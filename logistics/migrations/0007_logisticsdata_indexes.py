@@ -0,0 +1,36 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0006_deliveryrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logisticsdata',
+            index=models.Index(fields=['robot', 'timestamp', 'id'], name='logistics_robot_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logisticsdata',
+            index=models.Index(fields=['dock', 'timestamp'], name='logistics_dock_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logisticsdata',
+            index=models.Index(fields=['timestamp'], name='logistics_timestamp_idx'),
+        ),
+        migrations.AlterField(
+            model_name='logisticsdata',
+            name='robot',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='logistics.robot'),
+        ),
+        migrations.AlterField(
+            model_name='logisticsdata',
+            name='dock',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='logistics.dock'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0007_logisticsdata_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dock',
+            name='current_load',
+            field=models.IntegerField(default=0, help_text='Current load'),
+        ),
+        migrations.AlterField(
+            model_name='dock',
+            name='location_x',
+            field=models.FloatField(help_text='X-axis coordinate'),
+        ),
+        migrations.AlterField(
+            model_name='dock',
+            name='location_y',
+            field=models.FloatField(help_text='Y-axis coordinate'),
+        ),
+        migrations.AlterField(
+            model_name='dock',
+            name='max_capacity',
+            field=models.IntegerField(help_text='Maximum load capacity'),
+        ),
+        migrations.AlterField(
+            model_name='logisticsdata',
+            name='load_delivered',
+            field=models.IntegerField(help_text='Delivery amount'),
+        ),
+        migrations.AlterField(
+            model_name='logisticsdata',
+            name='route_taken',
+            field=models.TextField(help_text='Robot delivery route record (e.g., coordinate sequence)'),
+        ),
+        migrations.AlterField(
+            model_name='robot',
+            name='current_x',
+            field=models.FloatField(help_text='Current X coordinate'),
+        ),
+        migrations.AlterField(
+            model_name='robot',
+            name='current_y',
+            field=models.FloatField(help_text='Current Y coordinate'),
+        ),
+        migrations.AlterField(
+            model_name='robot',
+            name='is_active',
+            field=models.BooleanField(default=True, help_text='Whether it is active'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='location_x',
+            field=models.FloatField(default=0, help_text='Warehouse X-axis coordinate'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='location_y',
+            field=models.FloatField(default=0, help_text='Warehouse Y-axis coordinate'),
+        ),
+        migrations.AlterField(
+            model_name='warehouse',
+            name='pending_cargo',
+            field=models.IntegerField(default=0, help_text='Amount of cargo pending for delivery'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 18:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0008_alter_field_help_texts'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logisticsdata',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-17 19:00
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """
+    Fold rollup rows sharing a key, which concurrent inserts could create before the constraint
+    existed, into the row with the lowest id.
+    """
+    DeliveryRollup = apps.get_model('logistics', 'DeliveryRollup')
+    duplicates = (
+        DeliveryRollup.objects.values('period', 'bucket_start', 'robot', 'dock')
+        .annotate(
+            rows=Count('id'), first=Min('id'),
+            load=Sum('load_delivered'), length=Sum('distance'),
+            records=Sum('record_count'), trips=Sum('trip_count'),
+        )
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        DeliveryRollup.objects.filter(pk=row['first']).update(
+            load_delivered=row['load'], distance=row['length'],
+            record_count=row['records'], trip_count=row['trips'],
+        )
+        DeliveryRollup.objects.filter(
+            period=row['period'], bucket_start=row['bucket_start'], robot=row['robot'], dock=row['dock'],
+        ).exclude(pk=row['first']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0009_logisticsdata_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='deliveryrollup',
+            constraint=models.UniqueConstraint(models.F('period'), models.F('bucket_start'), models.F('robot'), django.db.models.functions.comparison.Coalesce('dock', 0), name='unique_delivery_rollup'),
+        ),
+    ]
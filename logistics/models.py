@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 class Dock(models.Model):
     """
@@ -21,6 +23,7 @@ class Robot(models.Model):
     current_x = models.FloatField(help_text="Current X coordinate")
     current_y = models.FloatField(help_text="Current Y coordinate")
     is_active = models.BooleanField(default=True, help_text="Whether it is active")
+    capacity = models.PositiveIntegerField(default=5, help_text="Maximum units of cargo carried per trip")
 
     def __str__(self):
         return self.identifier
@@ -29,16 +32,52 @@ class LogisticsData(models.Model):
     """
     Historical delivery data model, used to store delivery records for subsequent statistics and AI analysis
     """
-    robot = models.ForeignKey(Robot, on_delete=models.CASCADE)
-    dock = models.ForeignKey(Dock, on_delete=models.CASCADE, null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # The composite indexes in Meta start with these columns, so the single-column FK indexes are redundant
+    robot = models.ForeignKey(Robot, on_delete=models.CASCADE, db_index=False)
+    dock = models.ForeignKey(Dock, on_delete=models.CASCADE, null=True, blank=True, db_index=False)
+    # A default rather than auto_now_add, so bulk loads can set historical timestamps
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     route_taken = models.TextField(help_text="Robot delivery route record (e.g., coordinate sequence)")
     load_delivered = models.IntegerField(help_text="Delivery amount")
+    start_x = models.FloatField(null=True, blank=True, help_text="Route start X coordinate, parsed from route_taken")
+    start_y = models.FloatField(null=True, blank=True, help_text="Route start Y coordinate, parsed from route_taken")
+    end_x = models.FloatField(null=True, blank=True, help_text="Route end X coordinate, parsed from route_taken")
+    end_y = models.FloatField(null=True, blank=True, help_text="Route end Y coordinate, parsed from route_taken")
+    distance = models.FloatField(null=True, blank=True, help_text="Route length, null if route_taken cannot be parsed")
+
+    class Meta:
+        indexes = [
+            # Per-robot history in time order (cost series, trajectories, demand per robot)
+            models.Index(fields=['robot', 'timestamp', 'id'], name='logistics_robot_time_idx'),
+            # Per-dock aggregates and cascades from Dock
+            models.Index(fields=['dock', 'timestamp'], name='logistics_dock_time_idx'),
+            # Time-range scans (retention purges, rollup rebuilds)
+            models.Index(fields=['timestamp'], name='logistics_timestamp_idx'),
+        ]
 
     def __str__(self):
         dock_name = self.dock.name if self.dock is not None else "Warehouse"
         return f"{self.robot.identifier} -> {dock_name} @ {self.timestamp}"
 
+    def save(self, *args, **kwargs):
+        self.fill_route_fields()
+        super().save(*args, **kwargs)
+
+    def fill_route_fields(self):
+        """
+        Populate the start/end coordinate columns and the distance column from route_taken.
+        Called automatically by save(); callers using bulk_create must call it themselves.
+        """
+        from .optimization import parse_route, euclidean_distance
+
+        start, end = parse_route(self.route_taken)
+        if start and end:
+            self.start_x, self.start_y = start
+            self.end_x, self.end_y = end
+            self.distance = euclidean_distance(start, end)
+        else:
+            self.start_x = self.start_y = self.end_x = self.end_y = self.distance = None
+
 
 class Warehouse(models.Model):
     """
@@ -51,3 +90,63 @@ class Warehouse(models.Model):
 
     def __str__(self):
         return "Warehouse"
+
+
+class CostCheckpoint(models.Model):
+    """
+    Persisted prefix of a robot's cumulative original-cost series, covering its delivery records
+    (ordered by timestamp, then id) up to the last one. Only the latest checkpoint of a robot is
+    kept; it lets the series be rebuilt without re-reading the history it covers. See
+    cost_checkpoints.py.
+    """
+    robot = models.ForeignKey(Robot, on_delete=models.CASCADE)
+    sequence = models.PositiveIntegerField(help_text="Position of the checkpoint in the robot's series, from 0")
+    last_timestamp = models.DateTimeField(help_text="Timestamp of the last record covered")
+    last_record_id = models.PositiveBigIntegerField(help_text="Id of the last record covered")
+    record_count = models.PositiveIntegerField(help_text="Number of records covered by this checkpoint")
+    cumulative_cost = models.FloatField(help_text="Cumulative cost after the last record covered")
+    series = models.BinaryField(help_text="Cumulative cost after each covered record, as float64 values")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['robot', 'sequence'], name='unique_cost_checkpoint_sequence'),
+        ]
+
+    def __str__(self):
+        return f"{self.robot.identifier} checkpoint {self.sequence}"
+
+
+class DeliveryRollup(models.Model):
+    """
+    Pre-aggregated delivery statistics of one robot at one dock (or returns to the warehouse,
+    with dock null) over one hour or day, maintained from LogisticsData; see rollups.py.
+    """
+    HOUR = 'hour'
+    DAY = 'day'
+    PERIOD_CHOICES = [(HOUR, 'Hour'), (DAY, 'Day')]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket_start = models.DateTimeField(help_text="Start of the hour or day covered")
+    robot = models.ForeignKey(Robot, on_delete=models.CASCADE)
+    dock = models.ForeignKey(Dock, on_delete=models.CASCADE, null=True, blank=True)
+    load_delivered = models.BigIntegerField(default=0, help_text="Total delivery amount")
+    distance = models.FloatField(default=0, help_text="Total route length of the records with a parsable route")
+    record_count = models.PositiveIntegerField(default=0, help_text="Number of delivery records")
+    trip_count = models.PositiveIntegerField(default=0, help_text="Number of completed trips (returns to the warehouse)")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['period', 'bucket_start'], name='rollup_period_bucket_idx'),
+            models.Index(fields=['robot', 'period', 'bucket_start'], name='rollup_robot_bucket_idx'),
+            models.Index(fields=['dock', 'period', 'bucket_start'], name='rollup_dock_bucket_idx'),
+        ]
+        constraints = [
+            # Returns have a null dock, and nulls never conflict in a plain unique index
+            models.UniqueConstraint(
+                'period', 'bucket_start', 'robot', Coalesce('dock', 0), name='unique_delivery_rollup'
+            ),
+        ]
+
+    def __str__(self):
+        dock_name = self.dock.name if self.dock is not None else "Warehouse"
+        return f"{self.robot.identifier} -> {dock_name} ({self.period} of {self.bucket_start})"
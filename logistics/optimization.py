@@ -1,5 +1,37 @@
-import math
+import re
+import warnings
+from itertools import islice
+from typing import NamedTuple
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Min, Sum, Window
 from .models import LogisticsData, Dock, Robot, Warehouse
+from .planning import euclidean_distance, iter_greedy_trips, plan_greedy_trips
+from .solver import plan_savings_trips
+from .distance_matrix import distance_submatrix
+from .live import publish_docks
+from .profiling import phase, record
+
+# A route is 'x1,y1 -> x2,y2': four decimal numbers, optionally surrounded by whitespace
+_NUMBER = r'[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?'
+ROUTE_PATTERN = re.compile(r'\s*({0})\s*,\s*({0})\s*->\s*({0})\s*,\s*({0})\s*'.format(_NUMBER))
+# Bytes that may appear in a well-formed route besides its separators
+_ROUTE_VALUE_BYTES = b'0123456789.+-eE \t'
+# ',' and '->' become one separator each, and so does the newline joining rows
+_TO_SEPARATORS = bytes.maketrans(b'\n', b',')
+
+
+class ParsedRoutes(NamedTuple):
+    """
+    Result of parse_routes.
+
+    coords is an (n, 4) float array of x1, y1, x2, y2 per route (zeros for malformed rows), valid
+    the boolean mask of the rows that parsed, and malformed the (index, value) of every other row.
+    """
+    coords: np.ndarray
+    valid: np.ndarray
+    malformed: list
+
 
 def parse_route(route_str):
     """
@@ -11,23 +43,136 @@ def parse_route(route_str):
     Returns:
         tuple: A tuple of two coordinates, representing the start and end points; returns (None, None) if parsing fails.
     """
-    try:
-        start_str, end_str = route_str.split("->")
-        x1, y1 = [float(val) for val in start_str.strip().split(",")]
-        x2, y2 = [float(val) for val in end_str.strip().split(",")]
-        return (x1, y1), (x2, y2)
-    except Exception:
+    match = ROUTE_PATTERN.fullmatch(route_str) if isinstance(route_str, str) else None
+    if match is None:
         return None, None
+    x1, y1, x2, y2 = map(float, match.groups())
+    return (x1, y1), (x2, y2)
+
+def _parse_chunk_fast(routes):
+    """
+    Parse a chunk of routes in one pass, or return None if any of them is malformed.
+
+    The rows are joined into one ASCII buffer. Deleting every byte a number may contain must leave
+    exactly ',', '>', ',' per row (so the separators are in place in every row), no field may be
+    empty (numpy would read it as -1), and numpy must then read exactly four numbers per row;
+    anything else (a stray character, a missing or malformed number) makes the chunk fall back to
+    the per-row parser.
+    """
+    if not all(isinstance(route, str) for route in routes):
+        return None
+    try:
+        data = '\n'.join(routes).encode('ascii')
+    except UnicodeEncodeError:
+        return None
+    if data.translate(None, _ROUTE_VALUE_BYTES) != b',>,\n' * (len(routes) - 1) + b',>,':
+        return None
+    data = data.replace(b'->', b',').translate(_TO_SEPARATORS)
+    fields = data.translate(None, b' \t')
+    if b',,' in fields or fields.startswith(b',') or fields.endswith(b','):
+        return None
+    try:
+        with warnings.catch_warnings():
+            # numpy warns (or raises, in future versions) when it stops before the end of the data
+            warnings.simplefilter('error')
+            values = np.fromstring(data, dtype=float, sep=',')
+    except (ValueError, DeprecationWarning):
+        return None
+    if values.size != 4 * len(routes):
+        return None
+    return values.reshape(-1, 4)
+
+
+def parse_routes(route_strings, chunk_size=10000):
+    """
+    Parse a batch of route strings into coordinate arrays, reporting malformed rows.
+
+    Routes are read in chunks of `chunk_size`; a chunk of well-formed routes is parsed with a
+    few bytes-level passes and a single numpy conversion instead of one parse_route call per row.
+    Only chunks containing a malformed route are parsed row by row (with the same rules as
+    parse_route), so malformed rows are located without slowing down the rest.
+
+    Parameters:
+        route_strings (iterable): Route strings (or None), e.g. a values_list('route_taken', flat=True) queryset.
+        chunk_size (int): Rows parsed together.
 
-def euclidean_distance(p1, p2):
-    return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+    Returns:
+        ParsedRoutes: coords, valid and malformed.
+    """
+    iterator = iter(route_strings)
+    parts = []
+    masks = []
+    malformed = []
+    offset = 0
+    with phase('parse'):
+        while True:
+            routes = list(islice(iterator, chunk_size))
+            if not routes:
+                break
+            coords = _parse_chunk_fast(routes)
+            if coords is not None:
+                valid = np.ones(len(routes), dtype=bool)
+            else:
+                coords = np.zeros((len(routes), 4))
+                valid = np.zeros(len(routes), dtype=bool)
+                for i, route_str in enumerate(routes):
+                    start, end = parse_route(route_str)
+                    if start is None:
+                        malformed.append((offset + i, route_str))
+                    else:
+                        coords[i] = start + end
+                        valid[i] = True
+            parts.append(coords)
+            masks.append(valid)
+            offset += len(routes)
+    record({'routes_parsed': offset, 'routes_malformed': len(malformed)})
+    if not parts:
+        return ParsedRoutes(np.zeros((0, 4)), np.zeros(0, dtype=bool), malformed)
+    return ParsedRoutes(np.concatenate(parts), np.concatenate(masks), malformed)
+
+def load_route_history(robot):
+    """
+    Load a robot's delivery history, ordered by timestamp, as coordinate arrays together with the
+    length of every segment and the running total.
+
+    Coordinates and distances come from the structured columns filled when each record is saved,
+    and the running total is computed by the database with a window Sum, so no route string is parsed.
+    Records whose route could not be parsed (null distance) are skipped.
+
+    Parameters:
+        robot (Robot): The robot whose history is loaded.
+
+    Returns:
+        tuple: A tuple containing the following three elements:
+            - coords (numpy.ndarray): An (n, 4) array of x1, y1, x2, y2 for each valid record.
+            - lengths (numpy.ndarray): The distance of each segment.
+            - cumulative (numpy.ndarray): The cumulative distance after each segment.
+    """
+    rows = (
+        LogisticsData.objects.filter(robot=robot, distance__isnull=False)
+        .annotate(cumulative=Window(Sum('distance'), order_by=(F('timestamp').asc(), F('id').asc())))
+        .order_by('timestamp', 'id')
+        .values_list('start_x', 'start_y', 'end_x', 'end_y', 'distance', 'cumulative')
+    )
+    with phase('history'):
+        data = np.array(list(rows.iterator(chunk_size=10000)), dtype=float).reshape(-1, 6)
+    return data[:, :4], data[:, 4], data[:, 5]
+
+async def aoriginal_total_cost(robot):
+    """
+    Total distance of a robot's original deliveries, computed with a single SQL Sum through the
+    async ORM. Records whose route could not be parsed (null distance) are skipped.
+    """
+    totals = await LogisticsData.objects.filter(robot=robot).aaggregate(total=Sum('distance'))
+    return totals['total'] or 0
 
 def calculate_original_cost(robot):
     """
     Calculate the total cost of the original path based on the robot's historical delivery data.
 
     This function retrieves all delivery records related to the robot from the LogisticsData model,
-    and calculates the delivery distance by parsing the route string in each record, then sums all distances.
+    reading each segment distance from the precomputed distance column, and sums all distances.
+    Records whose route could not be parsed are skipped.
 
     Parameters:
         robot (Robot): The robot instance for which to calculate the delivery cost.
@@ -38,127 +183,175 @@ def calculate_original_cost(robot):
             - original_routes (list): A list of detailed information for each delivery record, including dock name, 
               segment distance, route string, and delivery amount.
     """
-    records = LogisticsData.objects.filter(robot=robot)
+    records = (
+        LogisticsData.objects.filter(robot=robot, distance__isnull=False)
+        .values_list('route_taken', 'load_delivered', 'dock__name', 'distance')
+    )
     total_cost = 0
     original_routes = []
-    for record in records:
-        start, end = parse_route(record.route_taken)
-        if start and end:
-            d = euclidean_distance(start, end)
-            total_cost += d
-            # If dock is None, display as Warehouse
-            dock_name = record.dock.name if record.dock is not None else 'Warehouse'
-            original_routes.append({
-                'dock': dock_name,
-                'distance': d,
-                'route': record.route_taken,
-                'load': record.load_delivered,
-            })
+    with phase('original_cost'):
+        records = list(records)
+    for route_taken, load_delivered, dock_name, d in records:
+        total_cost += d
+        # If dock is None, display as Warehouse
+        original_routes.append({
+            'dock': dock_name if dock_name is not None else 'Warehouse',
+            'distance': d,
+            'route': route_taken,
+            'load': load_delivered,
+        })
     return total_cost, original_routes
 
-def calculate_optimized_route(robot):
+def get_warehouse_position():
+    """
+    Get warehouse coordinates from the Warehouse model, creating it at the origin if it doesn't exist.
+    """
+    warehouse_obj, created = Warehouse.objects.get_or_create(
+        id=1,
+        defaults={'location_x': 0, 'location_y': 0, 'pending_cargo': 0}
+    )
+    return (float(warehouse_obj.location_x), float(warehouse_obj.location_y))
+
+def load_robot_demand(robot):
+    """
+    Total amount delivered to each dock by the robot, capped at the dock's maximum capacity,
+    computed in a single grouped query and ordered by each dock's first record.
+
+    Returns:
+        tuple: A tuple containing the following two elements:
+            - docks (list): The Dock instances.
+            - demand (list): One (name, x, y, demand) tuple per dock, as expected by the planners.
+    """
+    docks = list(
+        Dock.objects.filter(logisticsdata__robot=robot)
+        .annotate(delivered=Sum('logisticsdata__load_delivered'), first_record=Min('logisticsdata__id'))
+        .order_by('first_record')
+    )
+    demand = [(dock.name, dock.location_x, dock.location_y, min(dock.delivered, dock.max_capacity)) for dock in docks]
+    return docks, demand
+
+def calculate_optimized_route(robot, persist=True, mode='greedy', time_budget=None, max_iterations=None, seed=0):
     """
     Calculate the optimized delivery route for a robot to reduce the total delivery cost.
 
-    This function first retrieves or creates the warehouse coordinates, and resets the current load of all docks to 0.
-    Then, it accumulates the delivery amount for each dock based on the data in LogisticsData, and adjusts it
-    according to the maximum capacity of each dock. Finally, it simulates multiple trips of the robot from the 
-    warehouse to various docks using a greedy algorithm, selecting the nearest dock for each trip until the 
-    robot's load reaches its limit, and returns the optimized delivery results and total cost.
+    This function first retrieves or creates the warehouse coordinates. Then, it accumulates the delivery
+    amount for each dock based on the data in LogisticsData, and adjusts it according to the maximum capacity
+    of each dock. Finally, it simulates multiple trips of the robot from the warehouse to various docks
+    using a greedy algorithm (plan_greedy_trips), selecting the nearest dock for each trip until the robot's
+    capacity is reached, and returns the optimized delivery results and total cost. The nearest dock with
+    remaining demand is looked up through a spatial index (see DockIndex) built once per call, so each hop
+    no longer scans every dock. Warehouse-to-dock and dock-to-dock distances are read from the shared
+    distance matrix (see distance_matrix.distance_submatrix) instead of being recomputed on every run.
+
+    With mode='savings' the trips are planned by plan_savings_trips instead (Clarke-Wright savings plus
+    2-opt/or-opt local search), bounded by `time_budget` seconds and `max_iterations` passes and
+    deterministic for a given `seed`. It never produces a costlier plan than the greedy mode.
+
+    When profiling is enabled (see profiling.py), the load, distances, plan and persist phases are
+    timed and the planner's statistics (hops, trips, docks scanned) are recorded for the request.
+
+    Dock loads are accumulated in memory while planning. When `persist` is True, the current load of all
+    docks is reset and the planned loads are written back in a single transaction (one bulk reset plus one
+    bulk_update); when it is False the call is read-only ("plan only" mode) and no Dock rows are written.
 
     Parameters:
         robot (Robot): The robot instance for which to calculate the optimized route.
+        persist (bool): Whether to write the planned dock loads back to the database.
+        mode (str): 'greedy' or 'savings'.
+        time_budget (float): Savings mode only, maximum seconds spent planning.
+        max_iterations (int): Savings mode only, maximum local search passes.
+        seed (int): Savings mode only, seed of the local search.
 
     Returns:
         tuple: A tuple containing the following two elements:
             - total_cost (float): The accumulated total distance cost of all optimized delivery trips.
-            - optimized_trips (list): A list of detailed information for each trip, each record containing the trip number,
+            - optimized_trips (TripPlan): A sequence of detailed information for each trip, each record containing the trip number,
               single trip cost, and detailed information for each segment (start point, end point, distance, 
-              delivery amount, dock name and position).
+              delivery amount, dock name and position). Segments are stored compactly and these dicts are
+              built as trips are accessed (see planning.TripPlan).
     """
-    # Get warehouse coordinates from the Warehouse model, create if it doesn't exist
-    warehouse_obj, created = Warehouse.objects.get_or_create(
-        id=1,
-        defaults={'location_x': 0, 'location_y': 0, 'pending_cargo': 0}
-    )
-    warehouse = (warehouse_obj.location_x, warehouse_obj.location_y)
-    
-    docks = Dock.objects.all()
-    for dock in docks:
-        dock.current_load = 0
-        dock.save()
-    
-    records = LogisticsData.objects.filter(robot=robot)
-    deliveries = {}
-    for record in records:
-        if record.dock is None:
-            continue
-        dock_id = record.dock.id
-        if dock_id in deliveries:
-            deliveries[dock_id]['remaining'] += record.load_delivered
+    if mode not in ('greedy', 'savings'):
+        raise ValueError(f"Unknown optimization mode: {mode}")
+    with phase('load'):
+        warehouse = get_warehouse_position()
+        docks, demand = load_robot_demand(robot)
+    with phase('distances'):
+        distances = distance_submatrix(warehouse, [dock.name for dock in docks])
+    stats = {'docks': len(docks)}
+    with phase('plan'):
+        if mode == 'greedy':
+            total_cost, optimized_trips, delivered = plan_greedy_trips(
+                warehouse, demand, robot.capacity, distances=distances, stats=stats
+            )
         else:
-            deliveries[dock_id] = {
-                'dock': record.dock,
-                'remaining': record.load_delivered,
-                'max_capacity': record.dock.max_capacity,
-            }
-    for item in deliveries.values():
-        if item['remaining'] > item['max_capacity']:
-            item['remaining'] = item['max_capacity']
-    
-    ROBOT_CAPACITY = 5
-    optimized_trips = []
-    total_cost = 0
-    trip_number = 0
-
-    while any(item['remaining'] > 0 for item in deliveries.values()):
-        trip_number += 1
-        trip_load = 0
-        current_position = warehouse
-        trip_cost = 0
-        segments = []
-        while trip_load < ROBOT_CAPACITY and any(item['remaining'] > 0 for item in deliveries.values()):
-            nearest_item = None
-            nearest_distance = None
-            for item in deliveries.values():
-                if item['remaining'] > 0:
-                    dock_pos = (item['dock'].location_x, item['dock'].location_y)
-                    d = euclidean_distance(current_position, dock_pos)
-                    if nearest_item is None or d < nearest_distance:
-                        nearest_item = item
-                        nearest_distance = d
-            if nearest_item is None:
-                break
-            deliver_amount = min(nearest_item['remaining'], ROBOT_CAPACITY - trip_load)
-            nearest_item['remaining'] -= deliver_amount
-            nearest_item['dock'].current_load += deliver_amount
-            nearest_item['dock'].save()
-            segment_info = {
-                'from': current_position,
-                'to': (nearest_item['dock'].location_x, nearest_item['dock'].location_y),
-                'distance': nearest_distance,
-                'delivered': deliver_amount,
-                'dock': nearest_item['dock'].name,
-                'position': (nearest_item['dock'].location_x, nearest_item['dock'].location_y)
-            }
-            segments.append(segment_info)
-            trip_load += deliver_amount
-            trip_cost += nearest_distance
-            current_position = (nearest_item['dock'].location_x, nearest_item['dock'].location_y)
-        return_distance = euclidean_distance(current_position, warehouse)
-        trip_cost += return_distance
-        segments.append({
-            'from': current_position,
-            'to': warehouse,
-            'distance': return_distance,
-            'delivered': 0,
-            'dock': 'Warehouse',
-            'position': warehouse
-        })
-        total_cost += trip_cost
-        optimized_trips.append({
-            'trip_number': trip_number,
-            'trip_cost': trip_cost,
-            'segments': segments,
-        })
+            total_cost, optimized_trips, delivered, report = plan_savings_trips(
+                warehouse, demand, robot.capacity,
+                time_budget=time_budget, max_iterations=max_iterations, seed=seed, distances=distances,
+            )
+            stats.update(trips=len(optimized_trips), local_search_passes=report['iterations'])
+    record(stats)
+    # Loads are accumulated on the in-memory instances, starting from empty docks
+    for dock, amount in zip(docks, delivered):
+        dock.current_load = amount
+
+    if persist:
+        with phase('persist'), transaction.atomic():
+            Dock.objects.update(current_load=0)
+            Dock.objects.bulk_update(
+                [dock for dock in docks if dock.current_load],
+                ['current_load'],
+                batch_size=500,
+            )
+            # bulk updates send no signals, so the live feed is told about every dock here
+            transaction.on_commit(lambda: publish_docks(Dock.objects.all()))
     return total_cost, optimized_trips
+
+def iter_optimized_route(robot, mode='greedy', time_budget=None, max_iterations=None, seed=0):
+    """
+    Streaming, read-only counterpart of calculate_optimized_route(robot, persist=False): yield the
+    robot's optimized trips one at a time, in the same dict format.
+
+    In greedy mode each trip is planned when the previous one has been consumed (see
+    iter_greedy_trips), so callers computing running totals or streaming output never hold the
+    whole plan. The savings solver has to finish before its first trip is known; its trips are
+    then yielded from the compact plan. The robot's demand is loaded when iteration starts.
+
+    Parameters:
+        robot, mode, time_budget, max_iterations, seed: As for calculate_optimized_route.
+
+    Returns:
+        generator: The trips, in order.
+    """
+    if mode not in ('greedy', 'savings'):
+        raise ValueError(f"Unknown optimization mode: {mode}")
+    with phase('load'):
+        warehouse = get_warehouse_position()
+        docks, demand = load_robot_demand(robot)
+    with phase('distances'):
+        distances = distance_submatrix(warehouse, [dock.name for dock in docks])
+    if mode == 'greedy':
+        yield from iter_greedy_trips(warehouse, demand, robot.capacity, distances=distances)
+    else:
+        _, optimized_trips, _, _ = plan_savings_trips(
+            warehouse, demand, robot.capacity,
+            time_budget=time_budget, max_iterations=max_iterations, seed=seed, distances=distances,
+        )
+        yield from optimized_trips
+
+def compare_solvers(robot, time_budget=None, max_iterations=None, seed=0):
+    """
+    Plan the robot's deliveries in savings mode without persisting anything and report the
+    distance saved versus the greedy plan.
+
+    Returns:
+        dict: The report returned by plan_savings_trips (greedy_cost, initial_cost, total_cost,
+            saved, saved_percent, iterations, elapsed, stopped).
+    """
+    warehouse = get_warehouse_position()
+    docks, demand = load_robot_demand(robot)
+    *_, report = plan_savings_trips(
+        warehouse, demand, robot.capacity,
+        time_budget=time_budget, max_iterations=max_iterations, seed=seed,
+        distances=distance_submatrix(warehouse, [dock.name for dock in docks]),
+    )
+    return report
@@ -0,0 +1,80 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from .models import Dock, LogisticsData
+from .optimization import calculate_optimized_route, get_warehouse_position
+
+GENERATION_KEY = 'logistics:plan:generation'
+
+
+def get_plan_cache():
+    """
+    Cache backend holding optimized plans, configured by the LOGISTICS_PLAN_CACHE alias.
+    """
+    return caches[getattr(settings, 'LOGISTICS_PLAN_CACHE', 'default')]
+
+
+def _generation(cache):
+    """
+    Current plan generation. It is bumped by invalidate_plans(); if the counter is missing
+    (first use or evicted) it restarts from the current time so stale keys are never reused.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = time.time_ns()
+        cache.add(GENERATION_KEY, generation, None)
+        generation = cache.get(GENERATION_KEY, generation)
+    return generation
+
+
+def plan_cache_key(robot):
+    """
+    Build the cache key for a robot's optimized plan.
+
+    The key combines the plan generation (bumped by signals whenever a Dock, Warehouse or
+    LogisticsData row changes), the robot's capacity, the warehouse position, the dock set and the
+    robot's LogisticsData high-water mark, so rows written without signals (bulk_create, queryset
+    updates) still produce a new key. Robot saves are not hooked, since positions change all the
+    time and only the capacity affects the plan.
+    """
+    cache = get_plan_cache()
+    # Resolved first: creating the warehouse would otherwise invalidate the plan being cached
+    warehouse = get_warehouse_position()
+    docks = Dock.objects.aggregate(count=Count('id'), last=Max('id'))
+    records = LogisticsData.objects.filter(robot=robot).aggregate(count=Count('id'), last=Max('id'))
+    return 'logistics:plan:{}:{}x{}:{},{}:{}-{}:{}-{}'.format(
+        _generation(cache), robot.pk, robot.capacity, *warehouse,
+        docks['count'], docks['last'] or 0,
+        records['count'], records['last'] or 0,
+    )
+
+
+def get_optimized_route(robot):
+    """
+    Cached, read-only counterpart of calculate_optimized_route.
+
+    Parameters:
+        robot (Robot): The robot instance for which to calculate the optimized route.
+
+    Returns:
+        tuple: (total_cost, optimized_trips), as returned by calculate_optimized_route(robot, persist=False).
+    """
+    cache = get_plan_cache()
+    key = plan_cache_key(robot)
+    plan = cache.get(key)
+    if plan is None:
+        plan = calculate_optimized_route(robot, persist=False)
+        cache.set(key, plan)
+    return plan
+
+
+def invalidate_plans():
+    """
+    Invalidate every cached plan by moving to a new generation.
+    """
+    cache = get_plan_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, time.time_ns(), None)
@@ -0,0 +1,306 @@
+"""
+Route planning algorithms working on plain coordinates and demand figures.
+
+This module has no Django dependencies, so plans can be computed in worker processes.
+"""
+import math
+from array import array
+from collections.abc import Sequence
+from .spatial import DockIndex
+
+# Dock position of the segment returning to the warehouse
+WAREHOUSE = -1
+
+
+def euclidean_distance(p1, p2):
+    return math.sqrt((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2)
+
+
+class TripPlan(Sequence):
+    """
+    Compact, read-only sequence of planned trips.
+
+    Segments are kept in parallel arrays (the position in `docks` of the dock each one drives to,
+    WAREHOUSE for the return leg, the amount delivered and the distance), with the end offset and
+    cost of every trip, instead of one dict per segment. A large plan is then a handful of arrays,
+    cheap to cache, pickle to worker processes and garbage collect. Indexing or iterating yields
+    trips in the dict format documented by calculate_optimized_route; they are built on access
+    and not kept, so code that only needs distances or points should use those methods instead.
+    """
+
+    __slots__ = ('warehouse', 'start', 'docks', 'positions', 'amounts', 'distances', 'ends', 'costs')
+
+    def __init__(self, warehouse, docks, start=None):
+        """
+        Parameters:
+            warehouse (tuple): Warehouse coordinates (x, y).
+            docks (list): The (name, x, y, demand) tuples the segment positions refer to.
+            start (tuple): Position of the robot before the first trip; defaults to the warehouse.
+        """
+        self.warehouse = warehouse
+        self.start = start if start is not None else warehouse
+        self.docks = docks
+        self.positions = array('l')
+        self.amounts = array('q')
+        self.distances = array('d')
+        self.ends = array('q')
+        self.costs = array('d')
+
+    def add_segment(self, position, amount, distance):
+        """
+        Append a segment to the trip being built.
+        """
+        self.positions.append(position)
+        self.amounts.append(amount)
+        self.distances.append(distance)
+
+    def end_trip(self, cost):
+        """
+        Close the trip being built (its last segment must be the return to the warehouse).
+        """
+        self.ends.append(len(self.positions))
+        self.costs.append(cost)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trip index out of range")
+        return self._trip(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._trip(index)
+
+    def __eq__(self, other):
+        if isinstance(other, (TripPlan, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"<TripPlan: {len(self)} trips, {len(self.positions)} segments>"
+
+    def _point(self, position):
+        if position == WAREHOUSE:
+            return self.warehouse
+        _, x, y, _ = self.docks[position]
+        return (x, y)
+
+    def _trip(self, index):
+        first = self.ends[index - 1] if index else 0
+        last = self.ends[index]
+        legs = zip(self.positions[first:last], self.amounts[first:last], self.distances[first:last])
+        origin = self.start if index == 0 else self.warehouse
+        return trip_dict(self.warehouse, self.docks, origin, index + 1, legs, self.costs[index])
+
+    def stops(self, index):
+        """
+        (dock position, amount) of every delivery of a trip, in visiting order.
+        """
+        first = self.ends[index - 1] if index else 0
+        return [
+            (self.positions[i], self.amounts[i])
+            for i in range(first, self.ends[index]) if self.positions[i] != WAREHOUSE
+        ]
+
+    def points(self, start=0, stop=None):
+        """
+        Yield the end point of every segment, in driving order, or of segments start..stop - 1 only.
+        """
+        for position in self.positions[start:stop]:
+            yield self._point(position)
+
+    @property
+    def hops(self):
+        """
+        Number of dock visits (segments other than returns to the warehouse).
+        """
+        return len(self.positions) - len(self.ends)
+
+
+def trip_dict(warehouse, docks, origin, number, legs, cost):
+    """
+    Build a trip in the dict format of calculate_optimized_route.
+
+    Parameters:
+        warehouse (tuple): Warehouse coordinates (x, y).
+        docks (list): The (name, x, y, demand) tuples the leg positions refer to.
+        origin (tuple): Where the trip starts.
+        number (int): Trip number, starting at 1.
+        legs (iterable): (dock position or WAREHOUSE, amount delivered, distance) of each segment.
+        cost (float): Cost of the trip.
+    """
+    current = origin
+    segments = []
+    for position, amount, distance in legs:
+        if position == WAREHOUSE:
+            name, point = 'Warehouse', warehouse
+        else:
+            name, x, y, _ = docks[position]
+            point = (x, y)
+        segments.append({
+            'from': current,
+            'to': point,
+            'distance': distance,
+            'delivered': amount,
+            'dock': name,
+            'position': point
+        })
+        current = point
+    return {
+        'trip_number': number,
+        'trip_cost': cost,
+        'segments': segments,
+    }
+
+
+def segment_distances(trips):
+    """
+    Distance of every segment of a plan, in driving order: read from the arrays of a TripPlan, or
+    from the segment dicts of any other iterable of trips (a stored task result, iter_greedy_trips).
+    """
+    if isinstance(trips, TripPlan):
+        return trips.distances
+    return [segment['distance'] for trip in trips for segment in trip['segments']]
+
+
+def segment_points(trips):
+    """
+    End point of every segment of a plan (a TripPlan or any iterable of trip dicts), in driving
+    order. Trips are consumed lazily, so with a generator only the trips reached are planned.
+    """
+    if isinstance(trips, TripPlan):
+        return trips.points()
+    return (segment['to'] for trip in trips for segment in trip['segments'])
+
+
+def _greedy_trips(warehouse, docks, capacity, start, distances, delivered, stats):
+    """
+    Core of the greedy planner: plan one trip at a time and yield it as (legs, cost), where legs
+    are the (dock position or WAREHOUSE, amount, distance) of its segments. Delivered amounts are
+    added to `delivered` as trips are planned, and `stats` is updated once every trip is.
+    """
+    remaining = [demand for _, _, _, demand in docks]
+    hops = 0
+    trips = 0
+
+    # Spatial index over the docks with remaining demand, in the same order as `docks`
+    index = DockIndex((x, y) for _, x, y, _ in docks)
+    for position, demand in enumerate(remaining):
+        if demand <= 0:
+            index.remove(position)
+
+    current_position = start if start is not None else warehouse
+    # Matrix node of the current position; None without a matrix or while away from every node
+    current_node = None
+    if distances is not None and (start is None or tuple(start) == tuple(warehouse)):
+        current_node = 0
+    while len(index):
+        trip_load = 0
+        trip_cost = 0
+        legs = []
+        while trip_load < capacity and len(index):
+            row = distances[current_node, 1:] if current_node is not None else None
+            position, nearest_distance = index.nearest(*current_position, row)
+            _, x, y, _ = docks[position]
+            deliver_amount = min(remaining[position], capacity - trip_load)
+            remaining[position] -= deliver_amount
+            if remaining[position] <= 0:
+                index.remove(position)
+            delivered[position] += deliver_amount
+            legs.append((position, deliver_amount, nearest_distance))
+            trip_load += deliver_amount
+            trip_cost += nearest_distance
+            current_position = (x, y)
+            if distances is not None:
+                current_node = position + 1
+        if current_node is not None:
+            return_distance = distances.item(current_node, 0)
+        else:
+            return_distance = euclidean_distance(current_position, warehouse)
+        trip_cost += return_distance
+        legs.append((WAREHOUSE, 0, return_distance))
+        hops += len(legs) - 1
+        trips += 1
+        yield legs, trip_cost
+        current_position = warehouse
+        if distances is not None:
+            current_node = 0
+    if stats is not None:
+        for name, amount in (('hops', hops), ('trips', trips), ('docks_scanned', index.scanned)):
+            stats[name] = stats.get(name, 0) + amount
+
+
+def plan_greedy_trips(warehouse, docks, capacity, start=None, distances=None, stats=None):
+    """
+    Plan delivery trips with the nearest-neighbour greedy algorithm.
+
+    Each trip leaves from the warehouse (the first one from `start` if given), repeatedly drives to
+    the nearest dock with remaining demand until the robot's capacity is used up, and returns to the
+    warehouse. Docks with equal distance are visited in the order they are listed. The whole plan
+    is collected into a TripPlan; iter_greedy_trips yields the same trips one at a time.
+
+    Parameters:
+        warehouse (tuple): Warehouse coordinates (x, y).
+        docks (list): One (name, x, y, demand) tuple per dock.
+        capacity (int): Maximum units of cargo the robot carries per trip.
+        start (tuple): Position of the robot before the first trip; defaults to the warehouse.
+        distances (SubMatrix): Optional (n + 1, n + 1) distance matrix, or numpy array, where node 0
+            is the warehouse and node i + 1 is docks[i] (see distance_matrix.distance_submatrix);
+            distances between these nodes are read from it instead of being recomputed.
+        stats (dict): Optional dict to which the planner's statistics are added: hops (dock
+            visits), trips and docks_scanned (candidates examined by the nearest-dock queries).
+
+    Returns:
+        tuple: A tuple containing the following three elements:
+            - total_cost (float): The accumulated total distance cost of all trips.
+            - optimized_trips (TripPlan): Trip number, trip cost and segments of each trip, in the format
+              returned by calculate_optimized_route.
+            - delivered (list): The amount delivered to each dock, in the order of `docks`.
+    """
+    if capacity <= 0:
+        raise ValueError("Robot capacity must be positive")
+    delivered = [0] * len(docks)
+    optimized_trips = TripPlan(warehouse, docks, start)
+    total_cost = 0
+    for legs, trip_cost in _greedy_trips(warehouse, docks, capacity, start, distances, delivered, stats):
+        for leg in legs:
+            optimized_trips.add_segment(*leg)
+        optimized_trips.end_trip(trip_cost)
+        total_cost += trip_cost
+    return total_cost, optimized_trips, delivered
+
+
+def iter_greedy_trips(warehouse, docks, capacity, start=None, distances=None, delivered=None, stats=None):
+    """
+    Generator counterpart of plan_greedy_trips: plan the same trips lazily and yield each one, in
+    the dict format, as soon as it is planned. Only the current trip is held, so callers can keep
+    running totals or stream output for plans of any size, and stop early without planning the rest.
+
+    Parameters:
+        warehouse, docks, capacity, start, distances, stats: As for plan_greedy_trips; stats is
+            only updated once the generator is exhausted.
+        delivered (list): Optional list, one entry per dock, to which delivered amounts are added
+            as trips are planned.
+
+    Returns:
+        generator: The trips, in planning order.
+    """
+    if capacity <= 0:
+        raise ValueError("Robot capacity must be positive")
+    if delivered is None:
+        delivered = [0] * len(docks)
+    origin = start if start is not None else warehouse
+    return (
+        trip_dict(warehouse, docks, origin if number == 1 else warehouse, number, legs, cost)
+        for number, (legs, cost) in enumerate(
+            _greedy_trips(warehouse, docks, capacity, start, distances, delivered, stats), start=1
+        )
+    )
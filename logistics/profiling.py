@@ -0,0 +1,283 @@
+import threading
+from contextlib import nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Profile of the request being handled; None outside profiled requests, which makes every hook a no-op
+_current = ContextVar('logistics_profile', default=None)
+_NO_PHASE = nullcontext()
+# End of a streamed body
+_END = object()
+
+
+def profiling_enabled():
+    """
+    Whether request profiling is switched on by LOGISTICS_PROFILING.
+    """
+    return getattr(settings, 'LOGISTICS_PROFILING', False)
+
+
+class Profile:
+    """
+    Timings and counters collected while handling one request.
+
+    Phases are named sections of code (see phase()); time spent in nested or repeated phases of
+    the same name is added up, and SQL time is included in the phase that ran the query.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {}
+        self.queries = 0
+        self.query_time = 0.0
+
+
+class _Phase:
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = perf_counter()
+
+    def __exit__(self, *exc_info):
+        phases = self.profile.phases
+        phases[self.name] = phases.get(self.name, 0.0) + perf_counter() - self.started
+
+
+def phase(name):
+    """
+    Context manager timing a named phase of the current request, e.g. `with phase('plan'):`.
+    Outside a profiled request it returns a shared do-nothing context manager.
+    """
+    profile = _current.get()
+    if profile is None:
+        return _NO_PHASE
+    return _Phase(profile, name)
+
+
+def count(name, amount=1):
+    """
+    Add to a counter of the current request (no-op outside a profiled request).
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.counters[name] = profile.counters.get(name, 0) + amount
+
+
+def record(stats):
+    """
+    Add a dict of counters (such as the optimizer statistics) to the current request.
+    """
+    profile = _current.get()
+    if profile is not None:
+        for name, amount in stats.items():
+            profile.counters[name] = profile.counters.get(name, 0) + amount
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.query_time += perf_counter() - started
+
+
+def _install_sql_wrapper(connection, **kwargs):
+    """
+    Time the queries of a database connection. The wrapper stays installed for the connection's
+    lifetime; it reads the profile from a context variable, which Django copies into the threads
+    running sync code for async views, so queries are attributed to the right request.
+    """
+    if _sql_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _sql_wrapper)
+
+
+class Metrics:
+    """
+    Process-wide totals of the profiled requests, per view, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.request_seconds = {}
+            self.queries = {}
+            self.query_seconds = {}
+            self.phase_seconds = {}
+            self.counters = {}
+
+    def observe(self, view, profile, duration):
+        with self._lock:
+            self.requests[view] = self.requests.get(view, 0) + 1
+            self.request_seconds[view] = self.request_seconds.get(view, 0.0) + duration
+            self.queries[view] = self.queries.get(view, 0) + profile.queries
+            self.query_seconds[view] = self.query_seconds.get(view, 0.0) + profile.query_time
+            for name, seconds in profile.phases.items():
+                self.phase_seconds[view, name] = self.phase_seconds.get((view, name), 0.0) + seconds
+            for name, amount in profile.counters.items():
+                self.counters[view, name] = self.counters.get((view, name), 0) + amount
+
+    def render(self):
+        """
+        All totals in the Prometheus text exposition format.
+        """
+        families = [
+            ('logistics_requests_total', 'Profiled requests.', ('view',), self.requests),
+            ('logistics_request_seconds_total', 'Time spent handling profiled requests.', ('view',), self.request_seconds),
+            ('logistics_sql_queries_total', 'SQL queries issued by profiled requests.', ('view',), self.queries),
+            ('logistics_sql_seconds_total', 'Time spent in SQL queries.', ('view',), self.query_seconds),
+            ('logistics_phase_seconds_total', 'Time spent in each phase.', ('view', 'phase'), self.phase_seconds),
+            ('logistics_optimizer_total', 'Optimizer and processing counters.', ('view', 'counter'), self.counters),
+        ]
+        lines = []
+        with self._lock:
+            for name, description, labels, values in families:
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(values.items()):
+                    key = key if isinstance(key, tuple) else (key,)
+                    label_text = ','.join(f'{label}="{_escape(part)}"' for label, part in zip(labels, key))
+                    lines.append(f"{name}{{{label_text}}} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+
+
+def server_timing(profile, duration):
+    """
+    Server-Timing header value of a profile: total, SQL and phase durations in milliseconds, and
+    the counters as descriptions.
+    """
+    entries = [
+        f"total;dur={duration * 1000:.2f}",
+        f'db;dur={profile.query_time * 1000:.2f};desc="{profile.queries} queries"',
+    ]
+    entries += [f"{name};dur={seconds * 1000:.2f}" for name, seconds in profile.phases.items()]
+    entries += [f'{name};desc="{amount}"' for name, amount in profile.counters.items()]
+    return ', '.join(entries)
+
+
+def _profiled_stream(content, profile, done):
+    """
+    Produce a streamed response body with the request's profile active, adding the time spent
+    generating it to the 'stream' phase, and call `done` once the stream is exhausted or closed.
+    """
+    iterator = iter(content)
+    try:
+        while True:
+            token = _current.set(profile)
+            try:
+                with _Phase(profile, 'stream'):
+                    chunk = next(iterator, _END)
+            finally:
+                _current.reset(token)
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        done()
+
+
+async def _aprofiled_stream(content, profile, done):
+    """
+    Asynchronous counterpart of _profiled_stream.
+    """
+    iterator = aiter(content)
+    try:
+        while True:
+            token = _current.set(profile)
+            try:
+                with _Phase(profile, 'stream'):
+                    chunk = await anext(iterator, _END)
+            finally:
+                _current.reset(token)
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        done()
+
+
+class ProfilingMiddleware:
+    """
+    Profile every request when LOGISTICS_PROFILING is on: SQL query count and time, the phases and
+    counters recorded by the instrumented code, reported in a Server-Timing header and added to the
+    process-wide metrics served by the metrics view. When profiling is off the middleware removes
+    itself from the stack at startup, and the hooks elsewhere only check an unset context variable.
+
+    The body of a streaming response is generated after its headers are sent, so its Server-Timing
+    header only covers the view. The body's queries and phases, and its generation time as the
+    'stream' phase, are still profiled, and the request is added to the metrics once the stream
+    is closed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not profiling_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        connection_created.connect(_install_sql_wrapper)
+        for connection in connections.all(initialized_only=True):
+            _install_sql_wrapper(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        profile = Profile()
+        token = _current.set(profile)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, started)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = _current.set(profile)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile, started)
+
+    @staticmethod
+    def finish(request, response, profile, started):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        response['Server-Timing'] = server_timing(profile, perf_counter() - started)
+        if not response.streaming:
+            metrics.observe(view, profile, perf_counter() - started)
+            return response
+
+        def done():
+            metrics.observe(view, profile, perf_counter() - started)
+
+        stream = _aprofiled_stream if response.is_async else _profiled_stream
+        response.streaming_content = stream(response.streaming_content, profile, done)
+        return response
@@ -0,0 +1,212 @@
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDay, TruncHour
+from django.utils import timezone
+from .models import DeliveryRollup, Dock, LogisticsData
+
+TRUNCATE = {DeliveryRollup.HOUR: TruncHour, DeliveryRollup.DAY: TruncDay}
+
+# Rollup rows updated per statement by add_to_rollups
+ADD_BATCH_SIZE = 500
+
+
+def bucket_start(timestamp, period):
+    """
+    Start of the hour or day containing `timestamp`, in the current time zone (matching TruncHour
+    and TruncDay in the database).
+    """
+    local = timezone.localtime(timestamp)
+    if period == DeliveryRollup.DAY:
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return local.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(date):
+    """
+    Aware datetime at the start of a calendar day in the current time zone.
+    """
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def rebuild_rollups(start=None, end=None, robot=None):
+    """
+    Recompute rollups from LogisticsData with grouped queries.
+
+    Only the days overlapping [start, end) are rebuilt when bounds are given (whole days, so the
+    day rollups stay complete); with no bounds every rollup is rebuilt. Rollups of history that has
+    since been pruned from LogisticsData are lost when their days are rebuilt.
+
+    Parameters:
+        start (datetime): Rebuild from the start of this timestamp's day.
+        end (datetime): Rebuild up to the end of this timestamp's day.
+        robot (Robot): Only rebuild this robot's rollups.
+
+    Returns:
+        int: The number of rollup rows written.
+    """
+    rollups = DeliveryRollup.objects.all()
+    records = LogisticsData.objects.all()
+    if start is not None:
+        start = bucket_start(start, DeliveryRollup.DAY)
+        rollups = rollups.filter(bucket_start__gte=start)
+        records = records.filter(timestamp__gte=start)
+    if end is not None:
+        end = bucket_start(end, DeliveryRollup.DAY) + timedelta(days=1)
+        rollups = rollups.filter(bucket_start__lt=end)
+        records = records.filter(timestamp__lt=end)
+    if robot is not None:
+        rollups = rollups.filter(robot=robot)
+        records = records.filter(robot=robot)
+
+    written = 0
+    with transaction.atomic():
+        rollups.delete()
+        for period, truncate in TRUNCATE.items():
+            rows = (
+                records.annotate(bucket=truncate('timestamp'))
+                .values('bucket', 'robot', 'dock')
+                .annotate(
+                    load=Coalesce(Sum('load_delivered'), 0),
+                    length=Coalesce(Sum('distance'), Value(0.0), output_field=FloatField()),
+                    records=Count('id'),
+                    trips=Count('id', filter=Q(dock__isnull=True)),
+                )
+                .order_by()
+            )
+            batch = []
+            for row in rows.iterator(chunk_size=2000):
+                batch.append(DeliveryRollup(
+                    period=period,
+                    bucket_start=row['bucket'],
+                    robot_id=row['robot'],
+                    dock_id=row['dock'],
+                    load_delivered=row['load'],
+                    distance=row['length'],
+                    record_count=row['records'],
+                    trip_count=row['trips'],
+                ))
+                if len(batch) == 2000:
+                    written += len(DeliveryRollup.objects.bulk_create(batch))
+                    batch = []
+            written += len(DeliveryRollup.objects.bulk_create(batch))
+    return written
+
+
+def add_to_rollups(records):
+    """
+    Add newly saved LogisticsData records to their hour and day rollups.
+
+    Missing rollup rows are first inserted empty with one bulk_create that skips existing keys
+    (see the unique constraint on DeliveryRollup), then the totals of every affected row are
+    incremented by one UPDATE, per ADD_BATCH_SIZE rows, with F() expressions. The increments run
+    in the database, so concurrent writers never overwrite each other's totals.
+    """
+    totals = {}
+    for record in records:
+        for period in TRUNCATE:
+            key = (period, bucket_start(record.timestamp, period), record.robot_id, record.dock_id)
+            load, distance, count, trips = totals.get(key, (0, 0.0, 0, 0))
+            totals[key] = (
+                load + record.load_delivered,
+                distance + (record.distance or 0.0),
+                count + 1,
+                trips + int(record.dock_id is None),
+            )
+    if not totals:
+        return
+    keys = list(totals)
+    with transaction.atomic():
+        DeliveryRollup.objects.bulk_create(
+            [
+                DeliveryRollup(period=period, bucket_start=start, robot_id=robot_id, dock_id=dock_id)
+                for period, start, robot_id, dock_id in keys
+            ],
+            batch_size=ADD_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        for first in range(0, len(keys), ADD_BATCH_SIZE):
+            batch = keys[first:first + ADD_BATCH_SIZE]
+            conditions = [
+                Q(period=period, bucket_start=start, robot_id=robot_id, dock_id=dock_id)
+                for period, start, robot_id, dock_id in batch
+            ]
+            amounts = [totals[key] for key in batch]
+            DeliveryRollup.objects.filter(reduce(or_, conditions)).update(
+                load_delivered=_increment('load_delivered', conditions, [a[0] for a in amounts], BigIntegerField()),
+                distance=_increment('distance', conditions, [a[1] for a in amounts], FloatField()),
+                record_count=_increment('record_count', conditions, [a[2] for a in amounts], IntegerField()),
+                trip_count=_increment('trip_count', conditions, [a[3] for a in amounts], IntegerField()),
+            )
+
+
+def _increment(field, conditions, amounts, output_field):
+    """
+    `field` plus the amount paired with the condition its row matches, as an update expression.
+    """
+    return F(field) + Case(
+        *(When(condition, then=Value(amount)) for condition, amount in zip(conditions, amounts)),
+        default=Value(0),
+        output_field=output_field,
+    )
+
+
+def _range_conditions(start_date=None, end_date=None, period=DeliveryRollup.DAY, prefix=''):
+    """
+    Conditions selecting the rollups of one period within an inclusive date range, optionally
+    through a relation named by `prefix`.
+    """
+    conditions = Q(**{f'{prefix}period': period})
+    if start_date is not None:
+        conditions &= Q(**{f'{prefix}bucket_start__gte': day_start(start_date)})
+    if end_date is not None:
+        conditions &= Q(**{f'{prefix}bucket_start__lt': day_start(end_date + timedelta(days=1))})
+    return conditions
+
+
+def dock_throughput(start_date=None, end_date=None):
+    """
+    Docks annotated with their delivered load (total_load), delivery count (deliveries) and route
+    length (distance) between two dates inclusive, read from the day rollups in one grouped query.
+
+    Parameters:
+        start_date (date): First day included; None for no lower bound.
+        end_date (date): Last day included; None for no upper bound.
+
+    Returns:
+        QuerySet: Every dock, ordered by id.
+    """
+    conditions = _range_conditions(start_date, end_date, prefix='deliveryrollup__')
+    return Dock.objects.annotate(
+        total_load=Coalesce(Sum('deliveryrollup__load_delivered', filter=conditions), 0),
+        deliveries=Coalesce(Sum('deliveryrollup__record_count', filter=conditions), 0),
+        distance=Coalesce(Sum('deliveryrollup__distance', filter=conditions), Value(0.0), output_field=FloatField()),
+    ).order_by('id')
+
+
+def throughput_series(period=DeliveryRollup.DAY, start_date=None, end_date=None, robot=None, dock=None):
+    """
+    Throughput per hour or day between two dates inclusive, summed over robots and docks (or
+    restricted to one of each), read from the rollups.
+
+    Returns:
+        QuerySet: Dicts with bucket_start, total_load, total_distance, records and trips, in
+            bucket order.
+    """
+    rollups = DeliveryRollup.objects.filter(_range_conditions(start_date, end_date, period))
+    if robot is not None:
+        rollups = rollups.filter(robot=robot)
+    if dock is not None:
+        rollups = rollups.filter(dock=dock)
+    return (
+        rollups.values('bucket_start')
+        .annotate(
+            total_load=Sum('load_delivered'),
+            total_distance=Sum('distance'),
+            records=Sum('record_count'),
+            trips=Sum('trip_count'),
+        )
+        .order_by('bucket_start')
+    )
@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import DeliveryRollup, Dock, LogisticsData, Robot, Warehouse
+from .plan_cache import invalidate_plans
+from .cost_checkpoints import invalidate_checkpoints
+from .rollups import add_to_rollups, bucket_start, rebuild_rollups
+from .live import publish_docks, publish_robot
+
+
+def _deleted_with(origin, model):
+    """
+    Whether a deletion started from an instance or queryset of `model`, i.e. the record is
+    being removed by a cascade.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(origin_model, model)
+
+
+# LogisticsData deletions do not need to drop plans: the record count is part of the plan cache key.
+# Their checkpoint and rollup receivers below make Django load the rows it deletes, so cleardata
+# purges large histories with raw batched deletes and updates the derived data itself.
+@receiver(post_save, sender=Dock)
+@receiver(post_delete, sender=Dock)
+@receiver(post_save, sender=Warehouse)
+@receiver(post_delete, sender=Warehouse)
+@receiver(post_save, sender=LogisticsData)
+def invalidate_cached_plans(sender, **kwargs):
+    """
+    Drop cached optimized plans whenever their input data changes.
+    """
+    invalidate_plans()
+
+
+def _moved_from(instance):
+    """
+    The (robot id, timestamp) an edited record was stored with, if the save changed either; None
+    for new and unmoved records.
+    """
+    previous = getattr(instance, '_previous_position', None)
+    if previous is None or previous == (instance.robot_id, instance.timestamp):
+        return None
+    return previous
+
+
+@receiver(pre_save, sender=LogisticsData)
+def remember_previous_position(sender, instance, raw=False, **kwargs):
+    """
+    Note the robot and timestamp an existing record is stored with before it is saved, so the
+    receivers below can also update the history it is moved out of.
+    """
+    instance._previous_position = None
+    if instance.pk is not None and not raw:
+        instance._previous_position = (
+            LogisticsData.objects.filter(pk=instance.pk).values_list('robot_id', 'timestamp').first()
+        )
+
+
+@receiver(post_save, sender=LogisticsData)
+def invalidate_cost_checkpoints(sender, instance, **kwargs):
+    """
+    Drop cumulative-cost checkpoints covering the saved record's position in the history, and its
+    previous position if the save moved it.
+    """
+    invalidate_checkpoints(instance.robot_id, instance.timestamp, instance.pk)
+    previous = _moved_from(instance)
+    if previous is not None:
+        invalidate_checkpoints(previous[0], previous[1], instance.pk)
+
+
+@receiver(post_delete, sender=LogisticsData)
+def invalidate_deleted_cost_checkpoints(sender, instance, origin=None, **kwargs):
+    """
+    Drop cumulative-cost checkpoints covering the deleted record, unless its robot is being
+    deleted, which takes the checkpoints with it.
+    """
+    if not _deleted_with(origin, Robot):
+        invalidate_checkpoints(instance.robot_id, instance.timestamp, instance.pk)
+
+
+@receiver(post_save, sender=LogisticsData)
+def update_delivery_rollups(sender, instance, created, **kwargs):
+    """
+    Add new records to their rollups; an edited record's day is rebuilt for its robot, since the
+    values it replaced are no longer known. When the edit changed the robot or the day, the day the
+    record was counted in before is rebuilt for the previous robot as well.
+    """
+    if created:
+        add_to_rollups([instance])
+        return
+    rebuild_rollups(instance.timestamp, instance.timestamp, instance.robot_id)
+    previous = _moved_from(instance)
+    if previous is not None:
+        robot_id, timestamp = previous
+        day = bucket_start(timestamp, DeliveryRollup.DAY)
+        if robot_id != instance.robot_id or day != bucket_start(instance.timestamp, DeliveryRollup.DAY):
+            rebuild_rollups(timestamp, timestamp, robot_id)
+
+
+@receiver(post_delete, sender=LogisticsData)
+def remove_from_delivery_rollups(sender, instance, origin=None, **kwargs):
+    """
+    Rebuild the deleted record's day for its robot. Deleting the record's robot or dock deletes
+    the rollups it was counted in, so cascades are skipped.
+    """
+    if not (_deleted_with(origin, Robot) or _deleted_with(origin, Dock)):
+        rebuild_rollups(instance.timestamp, instance.timestamp, instance.robot_id)
+
+
+@receiver(post_save, sender=Robot)
+def publish_robot_position(sender, instance, **kwargs):
+    """
+    Push the robot's position to the live feed once the change is committed.
+    """
+    transaction.on_commit(lambda: publish_robot(instance))
+
+
+@receiver(post_save, sender=Dock)
+def publish_dock_load(sender, instance, **kwargs):
+    """
+    Push the dock's load to the live feed once the change is committed.
+    """
+    transaction.on_commit(lambda: publish_docks([instance]))
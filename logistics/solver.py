@@ -0,0 +1,388 @@
+"""
+Capacitated vehicle routing solver: Clarke-Wright savings construction followed by
+2-opt and or-opt local search.
+
+Like planning.py, this module has no Django dependencies.
+"""
+import math
+import random
+import time
+import numpy as np
+from .planning import WAREHOUSE, TripPlan, euclidean_distance, plan_greedy_trips
+
+# Number of nearest customers considered for savings and or-opt insertions
+NEIGHBOURS = 30
+# Minimum improvement for a move to be applied, guarding against floating point noise
+EPSILON = 1e-9
+
+
+def _expired(deadline):
+    """
+    Whether the time.perf_counter() `deadline` has passed; None never expires.
+    """
+    return deadline is not None and time.perf_counter() > deadline
+
+
+def _neighbour_lists(state, k):
+    """
+    Indices of the k nearest other customers of every customer, nearest first, computed in blocks
+    so that memory stays bounded for large dock counts.
+    """
+    count = len(state.xs)
+    k = min(k, count - 1)
+    if k <= 0:
+        return [[] for _ in range(count)]
+    neighbours = []
+    for start in range(0, count, 256):
+        rows = np.arange(start, min(start + 256, count))
+        distances = state.block_distances(rows)
+        distances[np.arange(len(rows)), rows] = np.inf
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(distances, nearest, axis=1).argsort(axis=1, kind='stable')
+        neighbours.extend(np.take_along_axis(nearest, order, axis=1).tolist())
+    return neighbours
+
+
+class _Routes:
+    """
+    Mutable set of routes over customers 0..n-1, each route starting and ending at the warehouse.
+
+    Distances are read from `distances` (node 0 is the warehouse, `nodes[c]` the node of customer c)
+    when a matrix is given, and computed from the coordinates otherwise.
+    """
+
+    def __init__(self, warehouse, xs, ys, demand, capacity, distances=None, nodes=None):
+        self.warehouse = warehouse
+        self.xs = xs
+        self.ys = ys
+        self.demand = demand
+        self.capacity = capacity
+        self.matrix = distances
+        self.nodes = nodes
+        if distances is not None:
+            self.depot = distances[nodes, 0].tolist()
+        else:
+            self.depot = [euclidean_distance(warehouse, (x, y)) for x, y in zip(xs, ys)]
+        self.routes = []
+        self.loads = []
+        self.route_of = [0] * len(xs)
+
+    def distance(self, a, b):
+        """
+        Distance between two customers; None stands for the warehouse.
+        """
+        if a is None:
+            return 0.0 if b is None else self.depot[b]
+        if b is None:
+            return self.depot[a]
+        if self.matrix is not None:
+            return self.matrix.item(self.nodes[a], self.nodes[b])
+        return math.sqrt((self.xs[a] - self.xs[b])**2 + (self.ys[a] - self.ys[b])**2)
+
+    def block_distances(self, rows):
+        """
+        Distances from the given customers to every customer, as a (len(rows), n) array.
+        """
+        if self.matrix is not None:
+            nodes = np.asarray(self.nodes)
+            return self.matrix[np.ix_(nodes[rows], nodes)]
+        xs = np.asarray(self.xs)
+        ys = np.asarray(self.ys)
+        return np.sqrt((xs[rows, None] - xs[None, :])**2 + (ys[rows, None] - ys[None, :])**2)
+
+    def route_cost(self, route):
+        cost = self.depot[route[0]] + self.depot[route[-1]]
+        for a, b in zip(route, route[1:]):
+            cost += self.distance(a, b)
+        return cost
+
+    def total_cost(self):
+        return sum(self.route_cost(route) for route in self.routes if route)
+
+    def set_routes(self, routes):
+        self.routes = [list(route) for route in routes]
+        self.loads = [sum(self.demand[c] for c in route) for route in self.routes]
+        for r, route in enumerate(self.routes):
+            for c in route:
+                self.route_of[c] = r
+
+    def two_opt(self, r, deadline=None):
+        """
+        Apply improving segment reversals to route r until none is left or `deadline` passes.
+        """
+        route = self.routes[r]
+        improved = True
+        while improved:
+            improved = False
+            length = len(route)
+            for i in range(length - 1):
+                if _expired(deadline):
+                    return
+                before = route[i - 1] if i else None
+                for j in range(i + 1, length):
+                    after = route[j + 1] if j + 1 < length else None
+                    delta = (
+                        self.distance(before, route[i]) + self.distance(route[j], after)
+                        - self.distance(before, route[j]) - self.distance(route[i], after)
+                    )
+                    if delta > EPSILON:
+                        route[i:j + 1] = route[i:j + 1][::-1]
+                        improved = True
+
+    def relocate(self, customer, neighbours, max_chain=3):
+        """
+        Or-opt move: try to move a chain of up to `max_chain` customers starting at `customer` next to
+        one of its neighbours (in either orientation). Applies the first improving move found.
+        """
+        r = self.route_of[customer]
+        route = self.routes[r]
+        start = route.index(customer)
+        for length in range(1, max_chain + 1):
+            if start + length > len(route):
+                break
+            chain = route[start:start + length]
+            chain_load = sum(self.demand[c] for c in chain)
+            before = route[start - 1] if start else None
+            after = route[start + length] if start + length < len(route) else None
+            removal_gain = (
+                self.distance(before, chain[0]) + self.distance(chain[-1], after)
+                - self.distance(before, after)
+            )
+            if removal_gain <= EPSILON:
+                continue
+            for neighbour in neighbours:
+                if neighbour in chain:
+                    continue
+                target = self.route_of[neighbour]
+                if target != r and self.loads[target] + chain_load > self.capacity:
+                    continue
+                target_route = self.routes[target]
+                position = target_route.index(neighbour)
+                # Insert either right after or right before the neighbour
+                for insert_at in (position + 1, position):
+                    prev = target_route[insert_at - 1] if insert_at else None
+                    nxt = target_route[insert_at] if insert_at < len(target_route) else None
+                    if prev in chain or nxt in chain:
+                        continue
+                    for ordered in (chain, chain[::-1]):
+                        insertion_cost = (
+                            self.distance(prev, ordered[0]) + self.distance(ordered[-1], nxt)
+                            - self.distance(prev, nxt)
+                        )
+                        if removal_gain - insertion_cost > EPSILON:
+                            self._move(r, start, length, target, prev, nxt, ordered, chain_load)
+                            return True
+        return False
+
+    def _move(self, source, start, length, target, prev, nxt, chain, chain_load):
+        del self.routes[source][start:start + length]
+        self.loads[source] -= chain_load
+        target_route = self.routes[target]
+        # Positions may have shifted when source and target are the same route
+        if prev is None:
+            insert_at = 0 if nxt is not None else len(target_route)
+        else:
+            insert_at = target_route.index(prev) + 1
+        target_route[insert_at:insert_at] = chain
+        self.loads[target] += chain_load
+        for c in chain:
+            self.route_of[c] = target
+
+
+def _build_state(warehouse, docks, customers, capacity, distances):
+    """
+    Routing state and neighbour lists for (dock position, amount) customers.
+    """
+    xs = [docks[position][1] for position, _ in customers]
+    ys = [docks[position][2] for position, _ in customers]
+    nodes = [position + 1 for position, _ in customers]
+    state = _Routes(warehouse, xs, ys, [amount for _, amount in customers], capacity, distances, nodes)
+    return state, _neighbour_lists(state, NEIGHBOURS)
+
+
+def _savings_routes(state, neighbours, deadline=None):
+    """
+    Clarke-Wright parallel savings construction restricted to neighbour pairs. When `deadline`
+    passes, the routes merged so far are returned; every route is still within capacity.
+    """
+    count = len(state.xs)
+    savings = {}
+    for i in range(count):
+        if _expired(deadline):
+            break
+        for j in neighbours[i]:
+            pair = (i, j) if i < j else (j, i)
+            if pair not in savings:
+                savings[pair] = state.depot[i] + state.depot[j] - state.distance(i, j)
+    routes = {c: [c] for c in range(count)}
+    loads = {c: state.demand[c] for c in range(count)}
+    route_id = list(range(count))
+    for (i, j), saving in sorted(savings.items(), key=lambda item: (-item[1], item[0])):
+        if saving <= EPSILON or _expired(deadline):
+            break
+        ri, rj = route_id[i], route_id[j]
+        if ri == rj or loads[ri] + loads[rj] > state.capacity:
+            continue
+        first, second = routes[ri], routes[rj]
+        # i and j must be route ends for the two routes to be joined through the (i, j) edge
+        if first[-1] != i:
+            if first[0] != i:
+                continue
+            first.reverse()
+        if second[0] != j:
+            if second[-1] != j:
+                continue
+            second.reverse()
+        first.extend(second)
+        loads[ri] += loads.pop(rj)
+        for c in routes.pop(rj):
+            route_id[c] = ri
+    return [routes[r] for r in sorted(routes)]
+
+
+def plan_savings_trips(warehouse, docks, capacity, time_budget=None, max_iterations=None, seed=0, distances=None):
+    """
+    Plan delivery trips with the Clarke-Wright savings heuristic improved by local search.
+
+    Whole truckloads are first delivered with direct out-and-back trips. The remaining demand of each
+    dock becomes one customer, and customers are merged into routes by decreasing savings. If the
+    greedy plan is cheaper than this construction, the greedy trips are used as the starting point
+    instead, so the result never costs more than plan_greedy_trips. The routes are then improved
+    with 2-opt (within a route) and or-opt (moving chains of up to three customers, within or
+    between routes) until no move improves, `max_iterations` passes have run or `time_budget`
+    seconds have elapsed. The budget also bounds the savings construction and every 2-opt pass:
+    when it runs out the best plan found so far is returned (at worst the greedy plan, which is
+    always completed). Customers are visited in an order drawn from `seed`, so the result is
+    deterministic for a given seed unless the time budget cuts the search short.
+
+    Parameters:
+        warehouse (tuple): Warehouse coordinates (x, y).
+        docks (list): One (name, x, y, demand) tuple per dock.
+        capacity (int): Maximum units of cargo the robot carries per trip.
+        time_budget (float): Maximum seconds spent planning; None for no limit.
+        max_iterations (int): Maximum local search passes; None for no limit.
+        seed (int): Seed of the random customer order used by the local search.
+        distances (SubMatrix): Optional distance matrix, as accepted by plan_greedy_trips.
+
+    Returns:
+        tuple: A tuple containing the following four elements:
+            - total_cost (float), optimized_trips (TripPlan) and delivered (list), as returned by plan_greedy_trips.
+            - report (dict): greedy_cost, initial_cost (after construction), total_cost, saved (versus greedy),
+              saved_percent, iterations, elapsed (seconds) and stopped ('converged', 'time_budget' or
+              'max_iterations').
+    """
+    if capacity <= 0:
+        raise ValueError("Robot capacity must be positive")
+    started = time.perf_counter()
+    deadline = None if time_budget is None else started + time_budget
+    greedy_cost, greedy_trips, _ = plan_greedy_trips(warehouse, docks, capacity, distances=distances)
+
+    def leg(a, b):
+        # Distance between planner nodes: 0 is the warehouse, position + 1 is docks[position]
+        if distances is not None:
+            return distances.item(a, b)
+        return euclidean_distance(
+            warehouse if a == 0 else docks[a - 1][1:3],
+            warehouse if b == 0 else docks[b - 1][1:3],
+        )
+
+    # Savings construction: whole truckloads go on direct trips, the remainders are merged by savings
+    full_loads = []
+    customers = []
+    for position, (_, _, _, demand) in enumerate(docks):
+        if demand <= 0:
+            continue
+        full_loads.extend([position] * (demand // capacity))
+        if demand % capacity:
+            customers.append((position, demand % capacity))
+    state, neighbours = _build_state(warehouse, docks, customers, capacity, distances)
+    state.set_routes(_savings_routes(state, neighbours, deadline))
+    fixed_trips = [[(position, capacity)] for position in full_loads]
+    initial_cost = state.total_cost() + sum(2 * leg(0, position + 1) for position in full_loads)
+
+    # Start from the greedy plan instead when it is cheaper, so the result is never worse than greedy
+    if greedy_cost < initial_cost:
+        customers = []
+        routes = []
+        for trip in range(len(greedy_trips)):
+            routes.append([])
+            for position, amount in greedy_trips.stops(trip):
+                if amount:
+                    routes[-1].append(len(customers))
+                    customers.append((position, amount))
+        state, neighbours = _build_state(warehouse, docks, customers, capacity, distances)
+        state.set_routes(routes)
+        fixed_trips = []
+        initial_cost = greedy_cost
+
+    rng = random.Random(seed)
+    order = list(range(len(customers)))
+    iterations = 0
+    stopped = 'converged'
+    for r in range(len(state.routes)):
+        state.two_opt(r, deadline)
+    while True:
+        # The budget may already be spent by the construction or the initial 2-opt passes
+        if _expired(deadline):
+            stopped = 'time_budget'
+            break
+        if max_iterations is not None and iterations >= max_iterations:
+            stopped = 'max_iterations'
+            break
+        iterations += 1
+        rng.shuffle(order)
+        improved = False
+        for customer in order:
+            if _expired(deadline):
+                stopped = 'time_budget'
+                break
+            source = state.route_of[customer]
+            if state.relocate(customer, neighbours[customer]):
+                improved = True
+                state.two_opt(state.route_of[customer], deadline)
+                if state.routes[source]:
+                    state.two_opt(source, deadline)
+        if stopped == 'time_budget' or not improved:
+            break
+
+    # Assemble trips, merging consecutive visits to the same dock
+    stops = list(fixed_trips)
+    for route in state.routes:
+        trip = []
+        for c in route:
+            position, amount = customers[c]
+            if trip and trip[-1][0] == position:
+                trip[-1] = (position, trip[-1][1] + amount)
+            else:
+                trip.append((position, amount))
+        if trip:
+            stops.append(trip)
+    delivered = [0] * len(docks)
+    optimized_trips = TripPlan(warehouse, docks)
+    total_cost = 0
+    for trip in stops:
+        current_node = 0
+        trip_cost = 0
+        for position, amount in trip:
+            distance = leg(current_node, position + 1)
+            optimized_trips.add_segment(position, amount, distance)
+            delivered[position] += amount
+            trip_cost += distance
+            current_node = position + 1
+        return_distance = leg(current_node, 0)
+        trip_cost += return_distance
+        optimized_trips.add_segment(WAREHOUSE, 0, return_distance)
+        optimized_trips.end_trip(trip_cost)
+        total_cost += trip_cost
+
+    report = {
+        'greedy_cost': greedy_cost,
+        'initial_cost': initial_cost,
+        'total_cost': total_cost,
+        'saved': greedy_cost - total_cost,
+        'saved_percent': (greedy_cost - total_cost) / greedy_cost * 100 if greedy_cost else 0.0,
+        'iterations': iterations,
+        'elapsed': time.perf_counter() - started,
+        'stopped': stopped,
+    }
+    return total_cost, optimized_trips, delivered, report
@@ -0,0 +1,156 @@
+import math
+
+
+class DockIndex:
+    """
+    Static k-d tree over dock coordinates, used by the route optimizer to answer
+    "nearest dock that still has remaining demand" queries.
+
+    Points are identified by their position in the sequence passed to the constructor.
+    Points can be removed once their demand is exhausted; removed subtrees are skipped
+    during queries. Ties on distance are resolved in favour of the lowest position, so
+    the result is identical to a linear scan over the points in their original order.
+    `scanned` counts the candidate points examined by all queries so far.
+    """
+
+    LEAF_SIZE = 8
+
+    def __init__(self, points):
+        """
+        Build the index.
+
+        Parameters:
+            points (iterable): Sequence of (x, y) coordinates.
+        """
+        self._xs = []
+        self._ys = []
+        for x, y in points:
+            self._xs.append(x)
+            self._ys.append(y)
+        count = len(self._xs)
+        self._alive = [True] * count
+        self._leaf_of = [0] * count
+        # Per-node arrays: bounding box, children (None for leaves), leaf items, parent and live point count
+        self._bounds = []
+        self._children = []
+        self._items = []
+        self._parent = []
+        self._live = []
+        self.scanned = 0
+        if count:
+            self._build(list(range(count)), -1)
+
+    def __len__(self):
+        """
+        Number of points that have not been removed.
+        """
+        return self._live[0] if self._live else 0
+
+    def _build(self, indices, parent):
+        xs, ys = self._xs, self._ys
+        node = len(self._bounds)
+        min_x = min(xs[i] for i in indices)
+        max_x = max(xs[i] for i in indices)
+        min_y = min(ys[i] for i in indices)
+        max_y = max(ys[i] for i in indices)
+        self._bounds.append((min_x, min_y, max_x, max_y))
+        self._parent.append(parent)
+        self._live.append(len(indices))
+        if len(indices) <= self.LEAF_SIZE:
+            self._children.append(None)
+            self._items.append(indices)
+            for i in indices:
+                self._leaf_of[i] = node
+            return node
+        self._children.append(None)
+        self._items.append(None)
+        # Split on the wider axis at the median
+        coords = xs if (max_x - min_x) >= (max_y - min_y) else ys
+        indices.sort(key=coords.__getitem__)
+        middle = len(indices) // 2
+        left = self._build(indices[:middle], node)
+        right = self._build(indices[middle:], node)
+        self._children[node] = (left, right)
+        return node
+
+    def remove(self, index):
+        """
+        Remove a point from the index so that it is no longer returned by nearest().
+
+        Parameters:
+            index (int): Position of the point in the original sequence.
+        """
+        if not self._alive[index]:
+            return
+        self._alive[index] = False
+        node = self._leaf_of[index]
+        while node != -1:
+            self._live[node] -= 1
+            node = self._parent[node]
+
+    def nearest(self, x, y, distances=None):
+        """
+        Find the nearest remaining point to (x, y).
+
+        Parameters:
+            x (float): Query X coordinate.
+            y (float): Query Y coordinate.
+            distances (numpy.ndarray): Optional precomputed distances from (x, y) to every point,
+                e.g. a row of a DistanceMatrix; read instead of computing candidate distances.
+
+        Returns:
+            tuple: (index, distance) of the nearest remaining point, or (None, None) if the index is empty.
+        """
+        if not len(self):
+            return None, None
+        xs, ys, alive = self._xs, self._ys, self._alive
+        bounds, children, items, live = self._bounds, self._children, self._items, self._live
+        sqrt = math.sqrt
+        best_index = None
+        best_distance = math.inf
+        scanned = 0
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            if not live[node]:
+                continue
+            min_x, min_y, max_x, max_y = bounds[node]
+            dx = min_x - x if x < min_x else (x - max_x if x > max_x else 0.0)
+            dy = min_y - y if y < min_y else (y - max_y if y > max_y else 0.0)
+            # Lower bound on the distance to any point in this node; equal distances are kept for tie-breaking
+            if (dx or dy) and sqrt(dx * dx + dy * dy) > best_distance:
+                continue
+            pair = children[node]
+            if pair is None:
+                scanned += len(items[node])
+                for i in items[node]:
+                    if alive[i]:
+                        if distances is not None:
+                            d = distances.item(i)
+                        else:
+                            # Same expression as euclidean_distance so results are bit-identical
+                            d = sqrt((x - xs[i])**2 + (y - ys[i])**2)
+                        if d < best_distance or (d == best_distance and i < best_index):
+                            best_index = i
+                            best_distance = d
+                continue
+            left, right = pair
+            # Visit the child whose box is closer to the query first
+            if _box_gap(bounds[left], x, y) <= _box_gap(bounds[right], x, y):
+                stack.append(right)
+                stack.append(left)
+            else:
+                stack.append(left)
+                stack.append(right)
+        self.scanned += scanned
+        return best_index, best_distance
+
+
+def _box_gap(box, x, y):
+    """
+    Squared distance from (x, y) to an axis-aligned bounding box (0 if inside).
+    """
+    min_x, min_y, max_x, max_y = box
+    dx = min_x - x if x < min_x else (x - max_x if x > max_x else 0.0)
+    dy = min_y - y if y < min_y else (y - max_y if y > max_y else 0.0)
+    return dx * dx + dy * dy
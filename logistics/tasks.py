@@ -0,0 +1,30 @@
+from celery import shared_task
+from .models import Robot
+from .optimization import calculate_optimized_route
+from .plan_cache import get_optimized_route
+
+
+@shared_task
+def optimize_route(robot_id, persist=False):
+    """
+    Celery task computing a robot's optimized route outside the request/response cycle.
+
+    Parameters:
+        robot_id (int): Primary key of the robot to plan for.
+        persist (bool): Whether to write the planned dock loads back to the database; plan-only
+            runs go through the plan cache.
+
+    Returns:
+        dict: JSON-serializable result with the robot id, total cost and the list of trips
+            (coordinate tuples become lists).
+    """
+    robot = Robot.objects.get(pk=robot_id)
+    if persist:
+        total_cost, optimized_trips = calculate_optimized_route(robot, persist=True)
+    else:
+        total_cost, optimized_trips = get_optimized_route(robot)
+    return {
+        'robot_id': robot.pk,
+        'total_cost': total_cost,
+        'trips': list(optimized_trips),
+    }
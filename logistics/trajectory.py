@@ -0,0 +1,162 @@
+from datetime import datetime
+import numpy as np
+from django.db.models import Q
+from .models import LogisticsData
+from .planning import TripPlan, segment_points
+
+DEFAULT_PAGE_SIZE = 5000
+MAX_PAGE_SIZE = 50000
+
+
+def encode_cursor(timestamp, pk):
+    return f"{timestamp.isoformat()}~{pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Split a cursor produced by encode_cursor into (timestamp, pk); raises ValueError if malformed.
+    """
+    timestamp, _, pk = cursor.rpartition('~')
+    return datetime.fromisoformat(timestamp), int(pk)
+
+
+def original_trajectory_page(robot, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of a robot's original trajectory: the end point of every delivery record, in
+    timestamp order, preceded by the robot's current position on the first page.
+
+    Pages are selected by keyset pagination on (timestamp, id), so fetching a page costs the same
+    however deep into the history it is, and only `limit` rows are ever held in memory.
+
+    Parameters:
+        robot (Robot): The robot whose history is read.
+        cursor (str): Cursor returned with the previous page; None for the first page.
+        limit (int): Maximum number of records read for this page.
+
+    Returns:
+        tuple: A tuple containing the following two elements:
+            - points (numpy.ndarray): An (n, 2) array of x, y coordinates.
+            - next_cursor (str): Cursor of the following page, or None if this is the last page.
+    """
+    records = (
+        LogisticsData.objects.filter(robot=robot, distance__isnull=False)
+        .order_by('timestamp', 'id')
+    )
+    if cursor is not None:
+        timestamp, pk = decode_cursor(cursor)
+        records = records.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+    # One extra row tells whether another page follows
+    rows = list(records.values_list('end_x', 'end_y', 'timestamp', 'id')[:limit + 1].iterator(chunk_size=2000))
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][2], rows[-1][3])
+    points = [(x, y) for x, y, _, _ in rows]
+    if cursor is None:
+        points.insert(0, (robot.current_x, robot.current_y))
+    return np.array(points, dtype=float).reshape(-1, 2), next_cursor
+
+
+def optimized_trajectory_page(robot, trips, offset=0, limit=DEFAULT_PAGE_SIZE):
+    """
+    One page of an optimized plan's trajectory: the robot's current position followed by the end
+    point of every segment of `trips` (as returned by calculate_optimized_route).
+
+    A TripPlan's segment arrays are read directly from `offset`, so every page costs O(limit);
+    other plans are walked from their first segment.
+
+    Parameters:
+        robot (Robot): The robot the plan belongs to.
+        trips (TripPlan or list): The planned trips.
+        offset (int): Index of the first point of the page.
+        limit (int): Maximum number of points in the page.
+
+    Returns:
+        tuple: (points, next_offset), with next_offset None if this is the last page.
+    """
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+    if isinstance(trips, TripPlan):
+        # Point 0 is the robot's position and point i the end of segment i - 1
+        count = len(trips.positions) + 1
+        stop = min(offset + limit, count)
+        page = [(robot.current_x, robot.current_y)] if offset == 0 and stop else []
+        page.extend(trips.points(max(offset - 1, 0), max(stop - 1, 0)))
+        next_offset = stop if stop < count else None
+        return np.array(page, dtype=float).reshape(-1, 2), next_offset
+
+    def points():
+        yield robot.current_x, robot.current_y
+        yield from segment_points(trips)
+
+    page = []
+    next_offset = None
+    for index, point in enumerate(points()):
+        if index < offset:
+            continue
+        if len(page) == limit:
+            next_offset = index
+            break
+        page.append(point)
+    return np.array(page, dtype=float).reshape(-1, 2), next_offset
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Simplify a polyline with the Douglas-Peucker algorithm.
+
+    Parameters:
+        points (numpy.ndarray): An (n, 2) array of x, y coordinates.
+        tolerance (float): Maximum distance of a dropped point from the simplified line.
+
+    Returns:
+        numpy.ndarray: A boolean mask of the points that are kept; the first and last always are.
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    if len(points) <= 2:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+    # Explicit stack instead of recursion, so long histories cannot hit the recursion limit
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = points[first], points[last]
+        inner = points[first + 1:last]
+        dx, dy = end - start
+        length = np.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            distances = np.abs(dx * (inner[:, 1] - start[1]) - dy * (inner[:, 0] - start[0])) / length
+        farthest = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+def downsample(points, every=None, tolerance=None):
+    """
+    Reduce the number of points of a trajectory page.
+
+    Parameters:
+        points (numpy.ndarray): An (n, 2) array of x, y coordinates.
+        every (int): Keep every Nth point (the last point is always kept).
+        tolerance (float): Then simplify with douglas_peucker at this tolerance.
+
+    Returns:
+        numpy.ndarray: The remaining points, in order.
+    """
+    if every and every > 1 and len(points):
+        keep = np.zeros(len(points), dtype=bool)
+        keep[::every] = True
+        keep[-1] = True
+        points = points[keep]
+    if tolerance:
+        points = points[douglas_peucker(points, tolerance)]
+    return points
@@ -1,11 +1,33 @@
-from django.shortcuts import render, redirect, HttpResponse
+from django.shortcuts import render, redirect, get_object_or_404, HttpResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
-from .models import Dock, LogisticsData, Robot
-from .optimization import calculate_original_cost, calculate_optimized_route, parse_route, euclidean_distance
+from django.utils.dateparse import parse_date
+from django.conf import settings
+from .models import DeliveryRollup, Robot
+from .optimization import aoriginal_total_cost, iter_optimized_route
+from .cost_checkpoints import cumulative_cost_series
+from .rollups import dock_throughput, throughput_series
+from .live import get_broker, live_events
+from .ingest import ingest_records, parse_ndjson
+from .plan_cache import get_optimized_route
+from .profiling import metrics as profiling_metrics, phase, profiling_enabled
+from .tasks import optimize_route
+from .fleet import plan_fleet
+from .planning import segment_distances
+from .trajectory import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, downsample, optimized_trajectory_page, original_trajectory_page,
+)
+from asgiref.sync import sync_to_async
+from celery.result import AsyncResult
+from urllib.parse import urlencode
+import hmac
 import json
+import numpy as np
 
 
 def index(request):
@@ -15,12 +37,35 @@ def index(request):
     context = {}
     return render(request, 'logistics/index.html', context)
 
+def _date_range(request):
+    """
+    Inclusive (start, end) dates from the `start` and `end` query parameters (YYYY-MM-DD);
+    missing or malformed values are None.
+    """
+    dates = []
+    for name in ('start', 'end'):
+        try:
+            dates.append(parse_date(request.GET.get(name, '')))
+        except ValueError:
+            dates.append(None)
+    return tuple(dates)
+
+async def _arender(request, template_name, context):
+    """
+    render() for async views. The user is resolved through the async auth API first, so the auth
+    context processor does not run a synchronous query on the event loop.
+    """
+    request.user = await request.auser()
+    with phase('render'):
+        return render(request, template_name, context)
+
 @login_required
-def dashboard(request):
+async def dashboard(request):
     """
     Dashboard view, displaying the current load of each dock and historical delivery data.
-    Access is restricted to logged-in users. Historical delivery data is obtained by querying
-    the LogisticsData model, and the accumulated delivery amount for each Dock is calculated.
+    Access is restricted to logged-in users. The accumulated delivery amount for each Dock is read
+    from the day rollups (see rollups.py), optionally limited to the `start`/`end` date range,
+    with the async ORM.
     
     Parameters:
         request (HttpRequest): HTTP request object.
@@ -28,22 +73,58 @@ def dashboard(request):
     Returns:
         HttpResponse: The rendered dashboard page.
     """
-    docks = Dock.objects.all()
-    
-    # Statistics for accumulated delivery amount for each dock
-    dock_data = []
-    for dock in docks:
-        total_load = LogisticsData.objects.filter(dock=dock).aggregate(total=Sum('load_delivered'))['total'] or 0
-        dock_data.append({
+    start_date, end_date = _date_range(request)
+    # Accumulated delivery amount for each dock, computed from the rollups in a single grouped query
+    dock_data = [
+        {
             'name': dock.name,
             'current_load': dock.current_load,
-            'total_load': total_load,
-        })
+            'total_load': dock.total_load,
+            'deliveries': dock.deliveries,
+        }
+        async for dock in dock_throughput(start_date, end_date)
+    ]
 
     context = {
         'dock_data': dock_data,
+        'start_date': start_date,
+        'end_date': end_date,
     }
-    return render(request, 'logistics/dashboard.html', context)
+    return await _arender(request, 'logistics/dashboard.html', context)
+
+@login_required
+@require_GET
+def throughput(request):
+    """
+    JSON throughput statistics per hour or day, read from the rollups.
+
+    Query parameters:
+        period: 'day' (default) or 'hour'.
+        start, end: Inclusive date range (YYYY-MM-DD).
+        robot, dock: Restrict to one robot or dock id.
+    """
+    period = request.GET.get('period', DeliveryRollup.DAY)
+    if period not in (DeliveryRollup.HOUR, DeliveryRollup.DAY):
+        return JsonResponse({'error': f'Unknown period: {period}'}, status=400)
+    try:
+        robot_id, dock_id = (int(request.GET[name]) if request.GET.get(name) else None for name in ('robot', 'dock'))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid robot or dock id'}, status=400)
+    start_date, end_date = _date_range(request)
+    buckets = throughput_series(period, start_date, end_date, robot=robot_id, dock=dock_id)
+    return JsonResponse({
+        'period': period,
+        'buckets': [
+            {
+                'start': bucket['bucket_start'].isoformat(),
+                'load_delivered': bucket['total_load'],
+                'distance': bucket['total_distance'],
+                'records': bucket['records'],
+                'trips': bucket['trips'],
+            }
+            for bucket in buckets
+        ],
+    })
 
 def register(request):
     """
@@ -64,96 +145,332 @@ def register(request):
     
     return render(request, 'registration/register.html', {'form': form})
 
+def _optimized_plan(request, robot):
+    """
+    Optimized plan for the chart pages. When the page is opened with `?task=<id>` pointing at a
+    finished optimize_route task for this robot, its stored result is used; otherwise the plan
+    is computed (or served from the plan cache) synchronously.
+    """
+    task_id = request.GET.get('task')
+    if task_id:
+        result = AsyncResult(task_id)
+        if result.successful() and result.result.get('robot_id') == robot.pk:
+            return result.result['total_cost'], result.result['trips']
+    return get_optimized_route(robot)
+
+@login_required
+@require_POST
+def optimize_route_start(request):
+    """
+    Enqueue an optimize_route task for a robot (the `robot` POST field, or the first robot)
+    and return its id together with the URL to poll.
+    """
+    robot_id = request.POST.get('robot')
+    robot = get_object_or_404(Robot, pk=robot_id) if robot_id else Robot.objects.first()
+    if not robot:
+        return JsonResponse({'error': 'No robot data available yet, please generate data first.'}, status=404)
+    task = optimize_route.delay(robot.pk)
+    return JsonResponse({
+        'task_id': task.id,
+        'status_url': reverse('optimize_route_status', args=[task.id]),
+    }, status=202)
+
+@login_required
+@require_GET
+def optimize_route_stream(request):
+    """
+    Stream a robot's optimized trips as NDJSON, one line per trip as soon as it is planned, each
+    with the running total in `cumulative_cost`. The robot is given by the `robot` query parameter
+    (defaults to the first robot) and the solver by `mode` ('greedy' or 'savings'). Nothing is
+    persisted and the plan cache is bypassed, so the full plan is never held in memory.
+    """
+    robot_id = request.GET.get('robot')
+    robot = get_object_or_404(Robot, pk=robot_id) if robot_id else Robot.objects.first()
+    if not robot:
+        return JsonResponse({'error': 'No robot data available yet, please generate data first.'}, status=404)
+    mode = request.GET.get('mode', 'greedy')
+    if mode not in ('greedy', 'savings'):
+        return JsonResponse({'error': f'Unknown optimization mode: {mode}'}, status=400)
+
+    def lines():
+        total = 0
+        for trip in iter_optimized_route(robot, mode=mode):
+            total += trip['trip_cost']
+            yield json.dumps({**trip, 'cumulative_cost': total}) + '\n'
+
+    return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
 @login_required
-def cost_comparison(request):
+@require_GET
+def optimize_route_status(request, task_id):
+    """
+    JSON polling endpoint for an optimize_route task. Once the task has succeeded, the response
+    contains the total cost and links to the chart pages rendered from the stored result.
+    """
+    result = AsyncResult(task_id)
+    data = {
+        'task_id': task_id,
+        'state': result.state,
+        'ready': result.ready(),
+    }
+    if result.successful():
+        data['robot_id'] = result.result['robot_id']
+        data['total_cost'] = result.result['total_cost']
+        data['trip_count'] = len(result.result['trips'])
+        data['pages'] = {
+            name: f"{reverse(name)}?task={task_id}"
+            for name in ('cost_comparison', 'cumulative_cost', 'trajectory_animation')
+        }
+    elif result.failed():
+        data['error'] = str(result.result)
+    return JsonResponse(data)
+
+@login_required
+@require_GET
+def fleet_plan(request):
+    """
+    JSON view of the fleet plan: all pending dock demand split across the active robots.
+    Returns a summary per robot and the fleet makespan; `?detail=1` also includes every trip.
+    """
+    fleet = plan_fleet()
+    detail = request.GET.get('detail') == '1'
+    plans = []
+    for plan in fleet['plans']:
+        entry = {
+            'robot': plan['robot'],
+            'robot_id': plan['robot_id'],
+            'total_cost': plan['total_cost'],
+            'delivered': plan['delivered'],
+            'trip_count': len(plan['trips']),
+        }
+        if detail:
+            entry['trips'] = list(plan['trips'])
+        plans.append(entry)
+    return JsonResponse({
+        'plans': plans,
+        'makespan': fleet['makespan'],
+        'total_cost': fleet['total_cost'],
+    })
+
+@login_required
+async def cost_comparison(request):
     """
     Displays the cost comparison page (Bar Chart).
     Calculates the original and optimized path costs based on logistics data and passes them to the template.
+    The original cost comes from the async ORM; planning runs in a worker thread, so the event loop
+    keeps serving other requests meanwhile.
     """
-    robot = Robot.objects.first()
+    robot = await Robot.objects.afirst()
     if not robot:
         return HttpResponse("No robot data available yet, please generate data first.")
     
-    orig_cost, orig_routes = calculate_original_cost(robot)
-    opt_cost, _ = calculate_optimized_route(robot)
+    orig_cost = await aoriginal_total_cost(robot)
+    opt_cost, _ = await sync_to_async(_optimized_plan)(request, robot)
     
     context = {
         'robot': robot,
         'orig_cost': orig_cost,
         'opt_cost': opt_cost,
     }
-    return render(request, 'logistics/cost_comparison.html', context)
+    return await _arender(request, 'logistics/cost_comparison.html', context)
 
 @login_required
-def cumulative_cost(request):
+async def cumulative_cost(request):
     """
     Displays the cumulative cost change page (Line Chart).
     Calculates the cumulative cost data for original and optimized paths and passes them to the template.
+    The series (which may store checkpoints) and the plan are computed in worker threads.
     """
-    robot = Robot.objects.first()
+    robot = await Robot.objects.afirst()
     if not robot:
         return HttpResponse("No robot data available yet, please generate data first.")
     
-    # Get all logistics data, sorted by timestamp
-    records = LogisticsData.objects.filter(robot=robot).order_by('timestamp')
-    original_cum = []
-    cumulative = 0
-    for record in records:
-        start, end = parse_route(record.route_taken)
-        if start and end:
-            d = euclidean_distance(start, end)
-            cumulative += d
-            original_cum.append(round(cumulative, 2))
+    # Original cumulative cost series, read from stored checkpoints plus the records since the last one
+    with phase('cost_series'):
+        original_cum = np.round(await sync_to_async(cumulative_cost_series)(robot), 2).tolist()
     
-    # Get optimized delivery results, flatten multiple trips' segments
-    _, opt_trips = calculate_optimized_route(robot)
-    flat_segments = []
-    for trip in opt_trips:
-        flat_segments.extend(trip['segments'])
-    
-    optimized_cum = []
-    cumulative_opt = 0
-    for segment in flat_segments:
-        cumulative_opt += segment['distance']
-        optimized_cum.append(round(cumulative_opt, 2))
+    # Get optimized delivery results (shared with the other chart pages through the plan cache), flatten multiple trips' segments
+    _, opt_trips = await sync_to_async(_optimized_plan)(request, robot)
+    optimized_cum = np.round(np.cumsum(segment_distances(opt_trips)), 2).tolist()
     
     context = {
         'robot': robot,
         'original_cum': original_cum,
         'optimized_cum': optimized_cum,
     }
-    return render(request, 'logistics/cumulative_cost.html', context)
+    return await _arender(request, 'logistics/cumulative_cost.html', context)
 
 @login_required
-def trajectory_animation(request):
+async def trajectory_animation(request):
     """
     Displays the robot movement trajectory animation page (Scatter Chart animation).
-    Prepares coordinate data for original and optimized paths for frontend animation display.
+    The coordinates of the original and optimized paths are not embedded in the page; it fetches
+    them page by page from trajectory_data. Downsampling parameters (`every`, `tolerance`) and the
+    `task` of a finished optimization are passed on to the data URLs.
     """
-    robot = Robot.objects.first()
+    robot = await Robot.objects.afirst()
     if not robot:
         return HttpResponse("No robot data available yet, please generate data first.")
-    
-    # Prepare original path coordinate data (sorted by timestamp)
-    records = LogisticsData.objects.filter(robot=robot).order_by('timestamp')
-    original_coords = [{'x': robot.current_x, 'y': robot.current_y}]
-    for record in records:
-        start, end = parse_route(record.route_taken)
-        if end:
-            original_coords.append({'x': end[0], 'y': end[1]})
-    
-    # Prepare optimized path coordinate data
-    _, opt_trips = calculate_optimized_route(robot)
-    flat_segments = []
-    for trip in opt_trips:
-        flat_segments.extend(trip['segments'])
-    optimized_coords = [{'x': robot.current_x, 'y': robot.current_y}]
-    for segment in flat_segments:
-        optimized_coords.append({'x': segment['to'][0], 'y': segment['to'][1]})
-    
+
+    params = {'robot': robot.pk}
+    params.update((name, request.GET[name]) for name in ('every', 'tolerance', 'task') if request.GET.get(name))
     context = {
         'robot': robot,
-        'original_coords': json.dumps(original_coords),
-        'optimized_coords': json.dumps(optimized_coords),
+        'original_url': f"{reverse('trajectory_data', args=['original'])}?{urlencode(params)}",
+        'optimized_url': f"{reverse('trajectory_data', args=['optimized'])}?{urlencode(params)}",
     }
-    return render(request, 'logistics/trajectory_animation.html', context)
+    return await _arender(request, 'logistics/trajectory_animation.html', context)
+
+def _stream_trajectory(points, next_url):
+    """
+    Serialize a trajectory page as JSON in chunks, so large pages are never built as one string.
+    """
+    yield '{"points": ['
+    for start in range(0, len(points), 1000):
+        chunk = json.dumps([{'x': x, 'y': y} for x, y in points[start:start + 1000].tolist()])
+        yield (', ' if start else '') + chunk[1:-1]
+    yield f'], "next": {json.dumps(next_url)}}}'
+
+@login_required
+@require_GET
+def trajectory_data(request, path):
+    """
+    Paginated JSON stream of a robot's trajectory, `path` being 'original' (the delivery history)
+    or 'optimized' (the optimized plan).
+
+    Query parameters:
+        robot: Robot id; defaults to the first robot.
+        cursor: Cursor of the page to fetch, as found in the previous page's `next` URL.
+        limit: Maximum points per page (default DEFAULT_PAGE_SIZE, at most MAX_PAGE_SIZE).
+        every: Keep only every Nth point of each page.
+        tolerance: Simplify each page with Douglas-Peucker at this tolerance.
+        task: Finished optimize_route task whose stored plan is used for the optimized path.
+
+    Returns:
+        StreamingHttpResponse: {"points": [{"x": .., "y": ..}, ...], "next": URL of the next page or null}.
+    """
+    if path not in ('original', 'optimized'):
+        return JsonResponse({'error': f'Unknown path: {path}'}, status=404)
+    robot_id = request.GET.get('robot')
+    robot = get_object_or_404(Robot, pk=robot_id) if robot_id else Robot.objects.first()
+    if not robot:
+        return JsonResponse({'error': 'No robot data available yet, please generate data first.'}, status=404)
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        every = int(request.GET['every']) if request.GET.get('every') else None
+        tolerance = float(request.GET['tolerance']) if request.GET.get('tolerance') else None
+        cursor = request.GET.get('cursor') or None
+        if path == 'original':
+            points, next_cursor = original_trajectory_page(robot, cursor, limit)
+        else:
+            _, opt_trips = _optimized_plan(request, robot)
+            points, next_cursor = optimized_trajectory_page(robot, opt_trips, int(cursor or 0), limit)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid cursor, limit or downsampling parameter'}, status=400)
+
+    next_url = None
+    if next_cursor is not None:
+        params = request.GET.copy()
+        params['robot'] = str(robot.pk)
+        params['cursor'] = str(next_cursor)
+        next_url = f"{request.path}?{params.urlencode()}"
+    return StreamingHttpResponse(
+        _stream_trajectory(downsample(points, every, tolerance), next_url),
+        content_type='application/json',
+    )
+
+@login_required
+async def live(request):
+    """
+    Displays the live fleet page, which follows the live_feed event stream.
+    """
+    return await _arender(request, 'logistics/live.html', {})
+
+@login_required
+@require_GET
+async def live_feed(request):
+    """
+    Server-sent event stream of robot positions and dock loads.
+
+    The stream starts with the current state of every robot and dock, then pushes changes as they
+    are saved. Updates are coalesced per robot/dock and sent at most every
+    LOGISTICS_LIVE_MIN_INTERVAL seconds, so a slow client or a burst of changes never builds up a
+    backlog. Beyond LOGISTICS_LIVE_MAX_SUBSCRIBERS open streams in this process, new clients get
+    a 503 and retry later.
+    """
+    broker = get_broker()
+    if len(broker) >= getattr(settings, 'LOGISTICS_LIVE_MAX_SUBSCRIBERS', 500):
+        response = HttpResponse("Too many live feed subscribers, retry later.", status=503)
+        response['Retry-After'] = '10'
+        return response
+    min_interval = getattr(settings, 'LOGISTICS_LIVE_MIN_INTERVAL', 0.5)
+    heartbeat = getattr(settings, 'LOGISTICS_LIVE_HEARTBEAT', 15)
+
+    async def stream():
+        # Subscribed before the snapshot is read, so no change falls between the two
+        async with broker.subscribe() as subscription:
+            yield 'retry: 5000\n\n'
+            async for event in live_events(subscription, min_interval, heartbeat):
+                yield event
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _ingest_authorized(request):
+    """
+    Whether the request carries one of the LOGISTICS_INGEST_TOKENS as a bearer token.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    return any(
+        hmac.compare_digest(token.encode(), allowed.encode())
+        for allowed in getattr(settings, 'LOGISTICS_INGEST_TOKENS', [])
+    )
+
+@csrf_exempt
+@require_POST
+def ingest(request):
+    """
+    Bulk ingestion of delivery records sent by robots, authenticated with a bearer token.
+
+    The body is either JSON (a list of records, or an object with a `records` list) or, with
+    Content-Type application/x-ndjson, one record per line; NDJSON is read line by line, so large
+    uploads are never held in memory at once. Records are validated and written in batches (see
+    ingest_records), and the response acknowledges every batch.
+    """
+    if not _ingest_authorized(request):
+        response = JsonResponse({'error': 'A valid bearer token is required'}, status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    if request.content_type in ('application/x-ndjson', 'application/jsonl'):
+        records = parse_ndjson(request)
+    else:
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+        records = data.get('records') if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            return JsonResponse({'error': 'Expected a list of records'}, status=400)
+
+    batches = ingest_records(records)
+    return JsonResponse({
+        'accepted': sum(batch['accepted'] for batch in batches),
+        'rejected': sum(len(batch['rejected']) for batch in batches),
+        'batches': batches,
+    })
+
+@require_GET
+def metrics(request):
+    """
+    Totals of the profiled requests of this process in the Prometheus text format. Only served
+    while LOGISTICS_PROFILING is on, and only to local clients (loopback or INTERNAL_IPS).
+    """
+    local = ('127.0.0.1', '::1', *settings.INTERNAL_IPS)
+    if not profiling_enabled() or request.META.get('REMOTE_ADDR') not in local:
+        raise Http404
+    return HttpResponse(profiling_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')